@@ -4,9 +4,10 @@ This replaces the Tkinter UI so it works cleanly with the Python 3.12.11
 virtual environment even when Tcl/Tk is not available.
 
 Features:
-- In-browser microphone recording (MediaRecorder)
+- In-browser microphone recording (WebCodecs Opus where available, else MediaRecorder)
 - Live audio level meter and oscilloscope trace (WebAudio Analyser)
-- Noise gate / auto-pause on silence (configurable threshold + hold)
+- Noise gate / auto-pause on silence (configurable threshold + hold), evaluated
+  in an AudioWorklet on the audio thread
 - Microphone device selector (choose any audio input)
 - Trim/crop before saving (start/end seconds passed to ffmpeg)
 - Playback with scrub timeline slider
@@ -14,7 +15,8 @@ Features:
 - About modal (creator/date)
 - User-selected save location (File System Access API) with fallback
 - Upload to FastAPI backend
-- Converts to MP3 using local ./ffmpeg (preferred) or system ffmpeg
+- Remuxes Opus recordings to Ogg (no re-encode), or converts to MP3 on request,
+  using local ./ffmpeg (preferred) or system ffmpeg
 - Playback and download of last recordings
 
 Author: Glenn Mossy
@@ -23,9 +25,22 @@ Date: Jan 4, 2025
 
 from __future__ import annotations
 
+import asyncio
+import contextlib
+import functools
+import gzip
+import hashlib
+import json
 import os
+import re
+import secrets
+import string
+import struct
 import subprocess
-from datetime import datetime
+import time
+import uuid
+import zlib
+from collections.abc import AsyncIterator
 from pathlib import Path
 from typing import Any
 
@@ -36,8 +51,19 @@ except ImportError:
 else:
     load_dotenv()
 
-from fastapi import FastAPI, File, Form, HTTPException, UploadFile
-from fastapi.responses import HTMLResponse, JSONResponse
+try:
+    import orjson
+except ImportError:
+    orjson = None  # Optional: falls back to the stdlib json encoder
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # Not on Windows, which only runs a single worker in practice
+
+from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import HTMLResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 import sys
 
@@ -45,271 +71,362 @@ APP_TITLE = "Studio Recorder"
 BASE_DIR = Path(__file__).resolve().parent
 RECORDINGS_DIR = BASE_DIR / "recordings"
 RECORDINGS_DIR.mkdir(exist_ok=True)
-
-
+STATIC_DIR = BASE_DIR / "static"
+# Chunks streamed during recording; kept outside RECORDINGS_DIR so they are never served.
+PARTIAL_DIR = BASE_DIR / "partial_uploads"
+PARTIAL_DIR.mkdir(exist_ok=True)
+PARTIAL_MAX_AGE_S = 24 * 3600
+UPLOAD_CHUNK_SIZE = 1 << 20
+# Content hash -> saved result, so re-saving an identical take reuses the earlier files.
+# Kept outside RECORDINGS_DIR so the /recordings mount never serves it.
+DEDUPE_INDEX = BASE_DIR / "recordings_index.json"
+# uvicorn worker processes (opt-in; default 1). The per-core encode budget is split between them,
+# since uvicorn doesn't route saves by load.
+WORKERS = max(1, int(os.getenv("AUDIO_RECORDER_WORKERS") or 1))
+MAX_PARALLEL_ENCODES = max(1, (os.cpu_count() or 1) // WORKERS)
+
+# One ffmpeg per core (single-threaded under load); further saves wait their turn (FIFO)
+# instead of thrashing.
+_ENCODE_SEM = asyncio.Semaphore(MAX_PARALLEL_ENCODES)
+_encodes_in_flight = 0
+
+# Containers whose audio (Opus or Vorbis) can be copied into Ogg without re-encoding.
+_OGG_REMUXABLE = {".webm", ".ogg", ".opus"}
+
+# Session ext for raw WebCodecs Opus packets, framed as <u32 size><u32 samples@48k><packet>.
+OPUS_PACKET_EXT = "opuspkt"
+_OPUS_PRE_SKIP = 312  # libopus encoder lookahead at 48 kHz
+_OGG_MAX_PAGE_PACKETS = 50  # ~1 s of 20 ms packets per page
+
+
+_BIT_REVERSE = bytes(int(f"{i:08b}"[::-1], 2) for i in range(256))
+
+
+@functools.lru_cache(maxsize=1)
 def _ffmpeg_bin() -> str:
+    """Resolve ffmpeg once: the bundled binary next to this file, else PATH."""
     local = BASE_DIR / "ffmpeg"
     if local.exists() and os.access(local, os.X_OK):
         return str(local)
+    print(f"Warning: no executable {local}; falling back to ffmpeg on PATH", file=sys.stderr)
     return "ffmpeg"
 
 
+@functools.lru_cache(maxsize=1)
+def _ffmpeg_encoders() -> str:
+    """The `ffmpeg -encoders` listing for this build (empty if ffmpeg can't run)."""
+    try:
+        result = subprocess.run(
+            [_ffmpeg_bin(), "-hide_banner", "-encoders"],
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+    except OSError:
+        return ""
+    return result.stdout
+
+
+def _mp3_encoder() -> str:
+    """Prefer the fixed-point libshine encoder when this ffmpeg build has it."""
+    return "libshine" if " libshine " in _ffmpeg_encoders() else "libmp3lame"
+
+
+_STEM_ALLOWED = frozenset(string.ascii_letters + string.digits + "-_")
+_STEM_TRANS = str.maketrans({c: c if c in _STEM_ALLOWED else "_" for c in map(chr, range(128))})
+
+
 def _safe_stem(name: str) -> str:
-    stem = "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in name)
+    if name.isascii():
+        stem = name.translate(_STEM_TRANS)
+    else:
+        # Keep non-ASCII letters and digits (e.g. accented names) as before.
+        stem = "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in name)
     return stem.strip("_") or "recording"
 
 
 def _timestamp_name(prefix: str = "recording") -> str:
-    ts = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    ts = time.strftime("%Y-%m-%d_%H-%M-%S")
     return f"{prefix}_{ts}"
 
 
-app = FastAPI(title=APP_TITLE)
-app.mount("/recordings", StaticFiles(directory=str(RECORDINGS_DIR)), name="recordings")
+def _reserve_names(base: str, original_ext: str, output_ext: str) -> tuple[str, str]:
+    """Claim an unused timestamped source/output name pair for a new save.
+
+    Both files are created empty with "x", so two saves of the same base in the same
+    second get ``-2``, ``-3`` suffixes instead of overwriting each other.
+    """
+    stem = _timestamp_name(base)
+    candidate, n = stem, 1
+    while True:
+        # Keep the source from colliding with the converted output.
+        original_name = (
+            f"{candidate}_source{original_ext}" if original_ext == output_ext else f"{candidate}{original_ext}"
+        )
+        output_name = f"{candidate}{output_ext}"
+        try:
+            (RECORDINGS_DIR / original_name).open("x").close()
+            try:
+                (RECORDINGS_DIR / output_name).open("x").close()
+            except FileExistsError:
+                (RECORDINGS_DIR / original_name).unlink(missing_ok=True)
+                raise
+            return original_name, output_name
+        except FileExistsError:
+            n += 1
+            candidate = f"{stem}-{n}"
+
+
+async def _upload_chunks(file: UploadFile) -> AsyncIterator[bytes]:
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        yield chunk
+
+
+async def _session_chunks(parts: list[Path]) -> AsyncIterator[bytes]:
+    for part in parts:
+        with part.open("rb") as f:
+            while chunk := await asyncio.to_thread(f.read, UPLOAD_CHUNK_SIZE):
+                yield chunk
+
+
+def _sha256_files(paths: list[Path]) -> str:
+    hasher = hashlib.sha256()
+    for path in paths:
+        with path.open("rb") as f:
+            while chunk := f.read(UPLOAD_CHUNK_SIZE):
+                hasher.update(chunk)
+    return hasher.hexdigest()
+
 
+def _sha256_upload(f: Any) -> str:
+    """Hash an already spooled upload and rewind it for the save."""
+    hasher = hashlib.sha256()
+    while chunk := f.read(UPLOAD_CHUNK_SIZE):
+        hasher.update(chunk)
+    f.seek(0)
+    return hasher.hexdigest()
 
-@app.get("/", response_class=HTMLResponse)
-def index() -> str:
-    return f"""<!doctype html>
+
+def _output_stamp(output_name: str) -> list[int]:
+    st = (RECORDINGS_DIR / output_name).stat()
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _dedupe_lookup(key: str) -> dict[str, Any] | None:
+    """Earlier result for this key, if its output file is still on disk and unchanged."""
+    try:
+        entry = json.loads(DEDUPE_INDEX.read_text()).get(key)
+        if entry and _output_stamp(entry["result"]["output_filename"]) == entry["stamp"]:
+            return entry["result"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return None
+
+
+def _dedupe_store(key: str, result: dict[str, Any]) -> None:
+    stamp = _output_stamp(result["output_filename"])
+    # Workers share the index; hold a sidecar lock so concurrent saves don't drop each other's entries.
+    with DEDUPE_INDEX.with_name(f"{DEDUPE_INDEX.name}.lock").open("a") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            index = json.loads(DEDUPE_INDEX.read_text())
+        except (OSError, ValueError):
+            index = {}
+        index[key] = {"result": result, "stamp": stamp}
+        tmp = DEDUPE_INDEX.with_name(f"{DEDUPE_INDEX.name}.{uuid.uuid4().hex}.tmp")
+        tmp.write_text(json.dumps(index))
+        tmp.replace(DEDUPE_INDEX)
+
+
+def _session_parts(session_dir: Path) -> list[Path]:
+    """Return a session's chunk files in order, or raise if any sequence number is missing."""
+    parts = sorted(session_dir.glob("*.part"))
+    for expected, part in enumerate(parts):
+        if int(part.stem) != expected:
+            raise HTTPException(status_code=400, detail=f"missing chunk {expected}")
+    return parts
+
+
+def _prune_stale_sessions() -> None:
+    """Remove streamed sessions that were never finalized."""
+    cutoff = time.time() - PARTIAL_MAX_AGE_S
+    for session_dir in PARTIAL_DIR.iterdir():
+        try:
+            if session_dir.stat().st_mtime < cutoff:
+                for part in session_dir.iterdir():
+                    part.unlink()
+                session_dir.rmdir()
+        except OSError:
+            continue
+
+
+def _ogg_crc(data: bytes) -> int:
+    # Ogg uses the non-reflected CRC-32 (init 0, no final xor). Bit-reversing the
+    # input and output lets zlib's reflected CRC-32 do the work in C.
+    crc = ~zlib.crc32(data.translate(_BIT_REVERSE), 0xFFFFFFFF) & 0xFFFFFFFF
+    return int(f"{crc:032b}"[::-1], 2)
+
+
+def _ogg_page(serial: int, seq: int, granule: int, packets: list[bytes], header_type: int = 0) -> bytes:
+    segments = bytearray()
+    for packet in packets:
+        segments.extend(b"\xff" * (len(packet) // 255))
+        segments.append(len(packet) % 255)
+    page = bytearray(b"OggS\x00")
+    page.append(header_type)
+    page += struct.pack("<qIII", granule, serial, seq, 0)
+    page.append(len(segments))
+    page += segments
+    for packet in packets:
+        page += packet
+    page[22:26] = struct.pack("<I", _ogg_crc(bytes(page)))
+    return bytes(page)
+
+
+async def _ogg_opus_stream(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Wrap framed Opus packets from the browser in an Ogg Opus stream (RFC 7845).
+
+    This is a container write only: the packets are copied, never decoded.
+    """
+    serial = secrets.randbits(32)
+    head = b"OpusHead" + struct.pack("<BBHIhB", 1, 1, _OPUS_PRE_SKIP, 48000, 0, 0)
+    vendor = APP_TITLE.encode("utf-8")
+    tags = b"OpusTags" + struct.pack("<I", len(vendor)) + vendor + struct.pack("<I", 0)
+    yield _ogg_page(serial, 0, 0, [head], header_type=0x02)
+    yield _ogg_page(serial, 1, 0, [tags])
+
+    seq = 2
+    granule = 0
+    buf = bytearray()
+    page: list[bytes] = []
+    page_segments = 0
+    async for chunk in chunks:
+        buf += chunk
+        offset = 0
+        while len(buf) - offset >= 8:
+            size, samples = struct.unpack_from("<II", buf, offset)
+            if len(buf) - offset - 8 < size:
+                break
+            packet = bytes(buf[offset + 8 : offset + 8 + size])
+            offset += 8 + size
+            packet_segments = size // 255 + 1
+            if page and (len(page) >= _OGG_MAX_PAGE_PACKETS or page_segments + packet_segments > 255):
+                yield _ogg_page(serial, seq, granule, page)
+                seq += 1
+                page, page_segments = [], 0
+            page.append(packet)
+            page_segments += packet_segments
+            granule += samples
+        del buf[:offset]
+    if buf:
+        raise HTTPException(status_code=400, detail="truncated opus packet stream")
+    yield _ogg_page(serial, seq, granule, page, header_type=0x04)
+
+
+async def _tee_to_ffmpeg(
+    chunks: AsyncIterator[bytes], first_chunk: bytes, original_path: Path, ffmpeg_cmd: list[str]
+) -> tuple[int, bytes]:
+    """Write a source to ``original_path`` while piping the same chunks into ffmpeg.
+
+    Encoding overlaps with the copy, and the source is read exactly once.
+    Returns ffmpeg's exit status and stderr.
+    """
+    proc = await asyncio.create_subprocess_exec(
+        *ffmpeg_cmd,
+        stdin=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    stderr_task = asyncio.create_task(proc.stderr.read())
+    feeding = True
+    try:
+        with original_path.open("wb") as out:
+            chunk = first_chunk
+            while chunk:
+                await asyncio.to_thread(out.write, chunk)
+                if feeding:
+                    try:
+                        proc.stdin.write(chunk)
+                        await proc.stdin.drain()
+                    except (BrokenPipeError, ConnectionResetError):
+                        # ffmpeg exited early; keep saving the original and report its error below.
+                        feeding = False
+                chunk = await anext(chunks, b"")
+    except BaseException:
+        # ffmpeg may already have exited (e.g. it rejected the input); re-raise the real error.
+        if proc.returncode is None:
+            with contextlib.suppress(ProcessLookupError):
+                proc.kill()
+        await proc.wait()
+        raise
+    proc.stdin.close()
+    return await proc.wait(), await stderr_task
+
+
+def _asset_version(name: str) -> str:
+    """Short content hash used to bust the cache when a static asset changes."""
+    return hashlib.sha256((STATIC_DIR / name).read_bytes()).hexdigest()[:12]
+
+
+@functools.lru_cache(maxsize=1)
+def _gcs_client() -> Any:
+    """Shared Cloud Storage client; building one costs auth discovery and a TLS handshake."""
+    from google.cloud import storage as gcs
+
+    return gcs.Client()
+
+
+class _CachedStaticFiles(StaticFiles):
+    """StaticFiles that lets browsers cache successful responses for a year.
+
+    Range requests (used by the <audio> scrubber) are handled by StaticFiles itself.
+    """
+
+    async def get_response(self, path: str, scope: Any) -> Response:
+        response = await super().get_response(path, scope)
+        if response.status_code in (200, 206, 304):
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
+
+class _FastJSONResponse(JSONResponse):
+    """JSONResponse serialized with orjson when it is installed."""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content)
+
+
+_ffmpeg_bin()  # resolve (and warn) at startup rather than on the first upload
+
+app = FastAPI(title=APP_TITLE, default_response_class=_FastJSONResponse)
+# Recording names are timestamped and asset URLs carry a content hash (?v=...),
+# so both are safe to cache forever.
+app.mount("/recordings", _CachedStaticFiles(directory=str(RECORDINGS_DIR)), name="recordings")
+# gzip only the text assets under /static; recordings are already compressed audio and
+# the index page is pre-gzipped.
+app.mount(
+    "/static",
+    GZipMiddleware(_CachedStaticFiles(directory=str(STATIC_DIR)), minimum_size=1024),
+    name="static",
+)
+
+
+_INDEX_HTML = f"""<!doctype html>
 <html lang=\"en\">
 <head>
   <meta charset=\"utf-8\" />
   <meta name=\"viewport\" content=\"width=device-width, initial-scale=1\" />
   <title>{APP_TITLE}</title>
-  <style>
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap');
-    :root {{
-      --bg: linear-gradient(135deg, #0f172a 0%, #1e293b 100%);
-      --card: rgba(30,41,59,0.65);
-      --card-border: rgba(148,163,184,0.12);
-      --text: #e2e8f0;
-      --muted: #94a3b8;
-      --accent: linear-gradient(135deg, #f97316 0%, #fb923c 100%);
-      --good: #22c55e;
-      --bad: #ef4444;
-    }}
-    * {{ box-sizing: border-box; }}
-    body {{
-      margin:0;
-      font-family: 'Inter', -apple-system, BlinkMacSystemFont, sans-serif;
-      background: var(--bg);
-      color: var(--text);
-      min-height: 100vh;
-    }}
-    .wrap {{
-      max-width: 860px;
-      margin: 0 auto;
-      padding: 32px 20px;
-    }}
-    .title {{
-      font-size: 36px;
-      font-weight: 700;
-      letter-spacing: -0.02em;
-      background: linear-gradient(135deg, #f97316, #fb923c);
-      -webkit-background-clip: text;
-      -webkit-text-fill-color: transparent;
-      background-clip: text;
-    }}
-    .subtitle {{
-      margin-top: 8px;
-      color: var(--muted);
-      font-size: 16px;
-      font-weight: 500;
-    }}
-    .grid {{
-      display: grid;
-      grid-template-columns: 1.3fr 0.9fr;
-      gap: 20px;
-      margin-top: 24px;
-    }}
-    .card {{
-      background: var(--card);
-      backdrop-filter: blur(20px);
-      -webkit-backdrop-filter: blur(20px);
-      border-radius: 20px;
-      padding: 24px;
-      box-shadow: 0 20px 40px rgba(0,0,0,0.25), 0 0 0 1px var(--card-border);
-      border: 1px solid var(--card-border);
-      transition: transform 0.3s ease, box-shadow 0.3s ease;
-    }}
-    .card:hover {{
-      transform: translateY(-2px);
-      box-shadow: 0 24px 48px rgba(0,0,0,0.3), 0 0 0 1px var(--card-border);
-    }}
-    .row {{ display:flex; align-items:center; gap:12px; flex-wrap: wrap; }}
-    button {{
-      border:0;
-      padding: 14px 18px;
-      border-radius: 14px;
-      font-weight: 600;
-      cursor: pointer;
-      font-family: inherit;
-      font-size: 15px;
-      transition: all 0.2s ease;
-      position: relative;
-      overflow: hidden;
-    }}
-    button::before {{
-      content: '';
-      position: absolute;
-      top: 0; left: 0; width: 100%; height: 100%;
-      background: linear-gradient(135deg, rgba(255,255,255,0.1), transparent);
-      opacity: 0;
-      transition: opacity 0.3s ease;
-    }}
-    button:hover::before {{ opacity: 1; }}
-    .primary {{
-      background: var(--accent);
-      color: #0f172a;
-      box-shadow: 0 4px 14px rgba(249,115,22,0.3);
-    }}
-    .primary:hover {{
-      transform: translateY(-1px);
-      box-shadow: 0 6px 20px rgba(249,115,22,0.4);
-    }}
-    .danger {{
-      background: var(--bad);
-      color: #0f172a;
-      box-shadow: 0 4px 14px rgba(239,68,68,0.3);
-    }}
-    .danger:hover {{
-      transform: translateY(-1px);
-      box-shadow: 0 6px 20px rgba(239,68,68,0.4);
-    }}
-    .ghost {{
-      background: rgba(148,163,184,0.08);
-      color: var(--text);
-      border: 1px solid rgba(148,163,184,0.2);
-      backdrop-filter: blur(8px);
-    }}
-    .ghost:hover {{
-      background: rgba(148,163,184,0.14);
-      border-color: rgba(148,163,184,0.3);
-    }}
-    button:disabled {{ opacity: .4; cursor: not-allowed; transform: none !important; }}
-    .pill {{
-      padding: 8px 14px;
-      border-radius: 999px;
-      background: rgba(148,163,184,0.12);
-      color: var(--muted);
-      font-size: 13px;
-      font-weight: 600;
-      backdrop-filter: blur(8px);
-    }}
-    canvas {{
-      width: 100%;
-      height: 140px;
-      background: rgba(11,18,35,0.6);
-      border-radius: 16px;
-      box-shadow: inset 0 2px 8px rgba(0,0,0,0.3);
-    }}
-    .meter {{
-      height: 10px;
-      width: 100%;
-      background: rgba(148,163,184,0.12);
-      border-radius: 999px;
-      overflow:hidden;
-      box-shadow: inset 0 1px 3px rgba(0,0,0,0.3);
-    }}
-    .meter > div {{
-      height: 100%;
-      width: 0%;
-      background: linear-gradient(90deg, var(--good), #10b981);
-      transition: width 60ms linear;
-      box-shadow: 0 0 8px rgba(34,197,94,0.4);
-    }}
-    .small {{ font-size: 13px; color: var(--muted); font-weight: 500; }}
-    a {{ color: var(--text); text-decoration: none; }}
-    a:hover {{ text-decoration: underline; }}
-    input[type=text], input[type=number], select {{
-      background: rgba(11,18,35,0.5);
-      border: 1px solid rgba(148,163,184,0.2);
-      color: var(--text);
-      padding: 12px 14px;
-      border-radius: 12px;
-      width: 100%;
-      font-family: inherit;
-      font-size: 15px;
-      backdrop-filter: blur(8px);
-      transition: border-color 0.2s ease, box-shadow 0.2s ease;
-    }}
-    input[type=text]:focus, input[type=number]:focus, select:focus {{
-      outline: none;
-      border-color: var(--accent);
-      box-shadow: 0 0 0 3px rgba(249,115,22,0.15);
-    }}
-    input[type=range] {{
-      width: 100%;
-      height: 6px;
-      background: rgba(148,163,184,0.12);
-      border-radius: 3px;
-      outline: none;
-      -webkit-appearance: none;
-    }}
-    input[type=range]::-webkit-slider-thumb {{
-      -webkit-appearance: none;
-      width: 18px;
-      height: 18px;
-      background: var(--accent);
-      border-radius: 50%;
-      cursor: pointer;
-      box-shadow: 0 2px 6px rgba(0,0,0,0.3);
-    }}
-    .modal-backdrop {{
-      position: fixed;
-      inset: 0;
-      background: rgba(2,6,23,0.75);
-      backdrop-filter: blur(12px);
-      -webkit-backdrop-filter: blur(12px);
-      display:none;
-      align-items: center;
-      justify-content: center;
-      padding: 20px;
-      animation: fadeIn 0.2s ease;
-    }}
-    .modal {{
-      width: min(540px, 96vw);
-      background: var(--card);
-      backdrop-filter: blur(24px);
-      -webkit-backdrop-filter: blur(24px);
-      border-radius: 20px;
-      padding: 24px;
-      box-shadow: 0 24px 48px rgba(0,0,0,0.35), 0 0 0 1px var(--card-border);
-      border: 1px solid var(--card-border);
-      animation: slideUp 0.3s ease;
-    }}
-    .modal h3 {{ margin: 0; font-size: 20px; font-weight: 700; }}
-    .modal .meta {{ margin-top: 16px; color: var(--muted); font-size: 14px; line-height: 1.5; }}
-    .modal .actions {{ display:flex; justify-content: flex-end; margin-top: 20px; }}
-    .about-btn, .settings-btn {{ padding: 10px 12px; border-radius: 999px; font-size: 13px; }}
-    kbd {{
-      background: rgba(148,163,184,0.12);
-      border: 1px solid rgba(148,163,184,0.2);
-      border-radius: 6px;
-      padding: 2px 6px;
-      font-size: 12px;
-      font-family: monospace;
-      color: var(--text);
-    }}
-    @keyframes fadeIn {{
-      from {{ opacity: 0; }}
-      to {{ opacity: 1; }}
-    }}
-    @keyframes slideUp {{
-      from {{ opacity: 0; transform: translateY(12px); }}
-      to {{ opacity: 1; transform: translateY(0); }}
-    }}
-    @keyframes pulse {{
-      0%, 100% {{ opacity: 1; }}
-      50% {{ opacity: 0.4; }}
-    }}
-    .pulse {{ animation: pulse 1.5s ease-in-out infinite; }}
-  </style>
+  <link rel=\"stylesheet\" href=\"/static/app.css?v={_asset_version('app.css')}\" />
+  <script defer src=\"/static/app.js?v={_asset_version('app.js')}\"
+          data-gate-worklet=\"/static/gate-worklet.js?v={_asset_version('gate-worklet.js')}\"></script>
 </head>
 <body>
   <div class=\"wrap\">
     <div class=\"title\">Studio Recorder</div>
-    <div class=\"subtitle\">Record in your browser, upload to Python, save MP3, and play back instantly.</div>
+    <div class=\"subtitle\">Record in your browser, upload to Python, save Ogg or MP3, and play back instantly.</div>
 
     <div class=\"grid\">
       <div class=\"card\">
@@ -330,13 +447,14 @@ def index() -> str:
           <canvas id=\"scope\" width=\"760\" height=\"140\"></canvas>
           <div style=\"margin-top:10px\" class=\"meter\"><div id=\"level\"></div></div>
           <div class=\"small\" style=\"margin-top:8px\">If you don’t see movement, allow microphone access in the browser prompt.</div>
+          <div class=\"small\" id=\"latency\" style=\"margin-top:4px\"></div>
         </div>
 
         <div class=\"row\" style=\"margin-top: 14px\">
           <button class=\"primary\" id=\"startBtn\">● Start</button>
           <button class=\"danger\" id=\"stopBtn\" disabled>■ Stop</button>
           <button class=\"ghost\" id=\"saveBtn\" disabled>💾 Save</button>
-          <button class=\"ghost\" id=\"playBtn\" disabled>▶︎ Play Last MP3</button>
+          <button class=\"ghost\" id=\"playBtn\" disabled>▶︎ Play Last</button>
         </div>
       </div>
 
@@ -363,6 +481,14 @@ def index() -> str:
           </div>
         </div>
 
+        <div class=\"small\" style=\"margin-top:12px\">Format</div>
+        <div style=\"margin-top:8px\">
+          <select id=\"outputFormat\">
+            <option value=\"ogg\">Ogg / Opus (instant remux when possible)</option>
+            <option value=\"mp3\">MP3 (re-encoded)</option>
+          </select>
+        </div>
+
         <div style=\"margin-top: 14px\" class=\"small\">Last saved</div>
         <div id=\"lastSaved\" style=\"margin-top:6px\">None</div>
 
@@ -381,7 +507,7 @@ def index() -> str:
         </div>
 
         <div style=\"margin-top: 14px\" class=\"small\">Backend</div>
-        <div class=\"small\">Uploads: <code>/api/upload</code></div>
+        <div class=\"small\">Uploads: <code>/api/upload_chunk</code> + <code>/api/finalize</code> (or <code>/api/upload</code>)</div>
         <div class=\"small\">Saved files: <code>/recordings/&lt;file&gt;</code></div>
       </div>
     </div>
@@ -449,493 +575,70 @@ def index() -> str:
     </div>
   </div>
 
-<script>
-  const startBtn = document.getElementById('startBtn');
-  const stopBtn = document.getElementById('stopBtn');
-  const saveBtn = document.getElementById('saveBtn');
-  const playBtn = document.getElementById('playBtn');
-  const statusPill = document.getElementById('status');
-  const timerPill = document.getElementById('timer');
-  const canvas = document.getElementById('scope');
-  const ctx = canvas.getContext('2d');
-  const levelBar = document.getElementById('level');
-  const nameBase = document.getElementById('nameBase');
-  const lastSaved = document.getElementById('lastSaved');
-  const lastDuration = document.getElementById('lastDuration');
-  const downloadStatus = document.getElementById('downloadStatus');
-  const autoStatus = document.getElementById('autoStatus');
-  const deviceSelect = document.getElementById('deviceSelect');
-  const gateEnabled = document.getElementById('gateEnabled');
-  const gateThreshold = document.getElementById('gateThreshold');
-  const gateHold = document.getElementById('gateHold');
-  const trimStart = document.getElementById('trimStart');
-  const trimEnd = document.getElementById('trimEnd');
-  const links = document.getElementById('links');
-  const player = document.getElementById('player');
-  const scrubWrap = document.getElementById('scrubWrap');
-  const scrub = document.getElementById('scrub');
-  const scrubLabel = document.getElementById('scrubLabel');
-  const aboutBtn = document.getElementById('aboutBtn');
-  const aboutBackdrop = document.getElementById('aboutBackdrop');
-  const aboutCloseBtn = document.getElementById('aboutCloseBtn');
-  const settingsBtn = document.getElementById('settingsBtn');
-  const settingsBackdrop = document.getElementById('settingsBackdrop');
-  const settingsCloseBtn = document.getElementById('settingsCloseBtn');
-  const autoUploadGcs = document.getElementById('autoUploadGcs');
-  const autoTranscribe = document.getElementById('autoTranscribe');
-  const autoGcsIndicator = document.getElementById('autoGcsIndicator');
-  const autoTranscribeIndicator = document.getElementById('autoTranscribeIndicator');
-  const mainAutoGcsIndicator = document.getElementById('mainAutoGcsIndicator');
-  const mainAutoTranscribeIndicator = document.getElementById('mainAutoTranscribeIndicator');
-
-  let mediaRecorder;
-  let chunks = [];
-  let audioCtx;
-  let analyser;
-  let source;
-  let dataArray;
-  let rafId;
-  let startTs;
-  let timerId;
-  let lastMp3Url;
-  let lastBlob;
-  let lastRecordedMs;
-  let stream;
-  let recordingActive = false;
-  let gatePaused = false;
-  let silenceStartedAt = null;
-
-  function openAbout() {{
-    aboutBackdrop.style.display = 'flex';
-  }}
-
-  function closeAbout() {{
-    aboutBackdrop.style.display = 'none';
-  }}
-
-  function openSettings() {{
-    settingsBackdrop.style.display = 'flex';
-  }}
-
-  function closeSettings() {{
-    settingsBackdrop.style.display = 'none';
-  }}
-
-  function setStatus(text) {{ statusPill.textContent = text; }}
-
-  function fmtTime(ms) {{
-    const sec = Math.floor(ms/1000);
-    const m = String(Math.floor(sec/60)).padStart(2,'0');
-    const s = String(sec%60).padStart(2,'0');
-    const secsOnly = sec % 60;
-    return `${{m}}:${{String(secsOnly).padStart(2,'0')}} (${{(ms/1000).toFixed(1)}}s)`;
-  }}
-
-  async function refreshDevices() {{
-    try {{
-      const devices = await navigator.mediaDevices.enumerateDevices();
-      const mics = devices.filter(d => d.kind === 'audioinput');
-      const current = deviceSelect.value;
-      deviceSelect.innerHTML = '<option value="">Default microphone</option>';
-      for (const d of mics) {{
-        const opt = document.createElement('option');
-        opt.value = d.deviceId;
-        opt.textContent = d.label || `Microphone (${{d.deviceId.slice(0,6)}}…)`;
-        deviceSelect.appendChild(opt);
-      }}
-      deviceSelect.value = current;
-    }} catch (e) {{
-      console.warn('enumerateDevices failed', e);
-    }}
-  }}
-
-  function triggerDownload(url, filename) {{
-    // Browsers will save to the user’s default Downloads folder (or whatever they configured).
-    const a = document.createElement('a');
-    a.href = new URL(url, window.location.href).toString();
-    a.download = filename || '';
-    a.rel = 'noopener';
-    document.body.appendChild(a);
-    a.click();
-    a.remove();
-  }}
-
-  async function saveWithPicker(url, filename) {{
-    // If supported, prompt the user for a save location.
-    // Falls back to normal browser download if the API isn't available.
-    if (window.showSaveFilePicker) {{
-      try {{
-        const handle = await window.showSaveFilePicker({{
-          suggestedName: filename || 'recording.mp3',
-          types: [{{
-            description: 'MP3 Audio',
-            accept: {{ 'audio/mpeg': ['.mp3'] }}
-          }}]
-        }});
-
-        const resp = await fetch(new URL(url, window.location.href).toString());
-        if (!resp.ok) throw new Error('Download failed: ' + resp.status);
-        const blob = await resp.blob();
-        const writable = await handle.createWritable();
-        await writable.write(blob);
-        await writable.close();
-        downloadStatus.textContent = 'Saved: ' + (filename || 'recording.mp3');
-        return; // Do not trigger fallback download
-      }} catch (err) {{
-        if (err && err.name === 'AbortError') {{
-          downloadStatus.textContent = 'Save canceled';
-          return;
-        }}
-        console.error(err);
-        downloadStatus.textContent = 'Save failed';
-        // Continue to fallback download.
-      }}
-    }}
-
-    // Fallback: normal browser download
-    triggerDownload(url, filename);
-    downloadStatus.textContent = 'Downloaded: ' + (filename || 'recording.mp3');
-  }}
-
-  function draw() {{
-    if (!analyser) return;
-    analyser.getByteTimeDomainData(dataArray);
-    ctx.fillStyle = '#0b1223';
-    ctx.fillRect(0,0,canvas.width,canvas.height);
-    ctx.lineWidth = 2;
-    ctx.strokeStyle = '#f97316';
-    ctx.beginPath();
-    const sliceWidth = canvas.width / dataArray.length;
-    let x = 0;
-    let sum = 0;
-    for (let i=0;i<dataArray.length;i++) {{
-      const v = dataArray[i] / 128.0;
-      const y = (v * canvas.height) / 2;
-      const dv = (dataArray[i] - 128) / 128;
-      sum += dv*dv;
-      if (i===0) ctx.moveTo(x,y);
-      else ctx.lineTo(x,y);
-      x += sliceWidth;
-    }}
-    ctx.stroke();
-    const rms = Math.sqrt(sum / dataArray.length);
-    const pct = Math.min(1, rms*1.8);
-    levelBar.style.width = `${{Math.floor(pct*100)}}%`;
-
-    // Noise gate / auto-pause on silence.
-    if (recordingActive && mediaRecorder && mediaRecorder.state) {{
-      const enabled = gateEnabled && gateEnabled.checked;
-      const threshold = (parseFloat(gateThreshold.value || '7') / 100.0);
-      const holdMs = parseInt(gateHold.value || '800', 10);
-
-      if (enabled) {{
-        if (rms < threshold) {{
-          if (silenceStartedAt === null) silenceStartedAt = Date.now();
-          if (!gatePaused && (Date.now() - silenceStartedAt) >= holdMs && mediaRecorder.state === 'recording' && mediaRecorder.pause) {{
-            try {{
-              mediaRecorder.pause();
-              gatePaused = true;
-              setStatus('Paused (silence)');
-            }} catch (e) {{
-              console.warn('pause failed', e);
-            }}
-          }}
-        }} else {{
-          silenceStartedAt = null;
-          if (gatePaused && mediaRecorder.state === 'paused' && mediaRecorder.resume) {{
-            try {{
-              mediaRecorder.resume();
-              gatePaused = false;
-              setStatus('Recording…');
-            }} catch (e) {{
-              console.warn('resume failed', e);
-            }}
-          }}
-        }}
-      }}
-    }}
-
-    rafId = requestAnimationFrame(draw);
-  }}
-
-  async function initMic(deviceId) {{
-    if (stream) {{
-      for (const t of stream.getTracks()) t.stop();
-    }}
-
-    const constraints = deviceId
-      ? {{ audio: {{ deviceId: {{ exact: deviceId }} }} }}
-      : {{ audio: true }};
-
-    stream = await navigator.mediaDevices.getUserMedia(constraints);
-    audioCtx = new (window.AudioContext || window.webkitAudioContext)();
-    analyser = audioCtx.createAnalyser();
-    analyser.fftSize = 2048;
-    dataArray = new Uint8Array(analyser.fftSize);
-    source = audioCtx.createMediaStreamSource(stream);
-    source.connect(analyser);
-    rafId = requestAnimationFrame(draw);
-
-    const options = {{ mimeType: 'audio/webm;codecs=opus' }};
-    mediaRecorder = MediaRecorder.isTypeSupported(options.mimeType)
-      ? new MediaRecorder(stream, options)
-      : new MediaRecorder(stream);
-
-    mediaRecorder.ondataavailable = (e) => {{
-      if (e.data && e.data.size > 0) chunks.push(e.data);
-    }};
-
-    mediaRecorder.onstop = () => {{
-      const blob = new Blob(chunks, {{ type: mediaRecorder.mimeType || 'audio/webm' }});
-      chunks = [];
-      lastBlob = blob;
-      saveBtn.disabled = false;
-      setStatus('Ready to save');
-    }};
-
-    await refreshDevices();
-  }}
-
-  async function uploadBlob(blob) {{
-    setStatus('Uploading…');
-    const fd = new FormData();
-    const base = (nameBase.value || 'recording').trim();
-    const ext = (blob.type.includes('webm') ? 'webm' : 'bin');
-    fd.append('file', blob, `${{base}}.${{ext}}`);
-    fd.append('name_base', base);
-    const ts = (trimStart.value || '').trim();
-    const te = (trimEnd.value || '').trim();
-    if (ts) fd.append('trim_start', ts);
-    if (te) fd.append('trim_end', te);
-    if (autoUploadGcs.checked) {{
-      autoGcsIndicator.style.display = 'inline';
-      autoGcsIndicator.textContent = '⏳';
-      mainAutoGcsIndicator.style.display = 'inline';
-      mainAutoGcsIndicator.classList.add('pulse');
-    }}
-    if (autoTranscribe.checked) {{
-      autoTranscribeIndicator.style.display = 'inline';
-      autoTranscribeIndicator.textContent = '⏳';
-      mainAutoTranscribeIndicator.style.display = 'inline';
-      mainAutoTranscribeIndicator.classList.add('pulse');
-    }}
-    if (autoUploadGcs.checked) fd.append('auto_upload_gcs', '1');
-    if (autoTranscribe.checked) fd.append('auto_transcribe', '1');
-
-    const res = await fetch('/api/upload', {{ method: 'POST', body: fd }});
-    if (!res.ok) {{
-      const txt = await res.text();
-      setStatus('Error');
-      alert(txt);
-      return;
-    }}
-    const data = await res.json();
-    setStatus('Saved');
-    lastSaved.textContent = data.mp3_filename || data.original_filename;
-    if (typeof lastRecordedMs === 'number') {{
-      lastDuration.textContent = `${{fmtTime(lastRecordedMs)}} (${{(lastRecordedMs/1000).toFixed(2)}}s)`;
-    }}
-    // Auto status feedback
-    const autoParts = [];
-    if (data.auto_gcs_uploaded) autoParts.push('GCS');
-    if (data.auto_transcribed) autoParts.push('Transcribed');
-    autoStatus.textContent = autoParts.length ? autoParts.join(' + ') : 'Disabled';
-
-    // Update indicators
-    if (autoUploadGcs.checked) {{
-      autoGcsIndicator.textContent = data.auto_gcs_uploaded ? '✅' : '❌';
-      mainAutoGcsIndicator.classList.remove('pulse');
-      mainAutoGcsIndicator.style.display = 'none';
-    }}
-    if (autoTranscribe.checked) {{
-      autoTranscribeIndicator.textContent = data.auto_transcribed ? '✅' : '❌';
-      mainAutoTranscribeIndicator.classList.remove('pulse');
-      mainAutoTranscribeIndicator.style.display = 'none';
-    }}
-    links.innerHTML = '';
-    if (data.mp3_url) {{
-      const a = document.createElement('a');
-      a.href = '#';
-      a.textContent = 'Download MP3';
-      a.addEventListener('click', async (e) => {{
-        e.preventDefault();
-        await saveWithPicker(data.mp3_url, data.mp3_filename);
-      }});
-      links.appendChild(a);
-      lastMp3Url = data.mp3_url;
-      playBtn.disabled = false;
-      player.src = data.mp3_url;
-      player.style.display = 'block';
-    }}
-  }}
-
-  function startTimer() {{
-    startTs = Date.now();
-    timerPill.textContent = '00:00';
-    timerId = setInterval(() => {{
-      const elapsed = Date.now() - startTs;
-      timerPill.textContent = fmtTime(elapsed);
-    }}, 200);
-  }}
-
-  function stopTimer() {{
-    clearInterval(timerId);
-    timerId = null;
-    timerPill.textContent = '00:00';
-  }}
-
-  startBtn.addEventListener('click', async () => {{
-    try {{
-      if (!mediaRecorder) await initMic(deviceSelect.value);
-      setStatus('Recording…');
-      startBtn.disabled = true;
-      stopBtn.disabled = false;
-      playBtn.disabled = true;
-      saveBtn.disabled = true;
-      recordingActive = true;
-      gatePaused = false;
-      silenceStartedAt = null;
-      mediaRecorder.start();
-      startTimer();
-    }} catch (err) {{
-      console.error(err);
-      alert('Microphone init failed: ' + err);
-    }}
-  }});
-
-  stopBtn.addEventListener('click', () => {{
-    try {{
-      setStatus('Stopping…');
-      stopBtn.disabled = true;
-      startBtn.disabled = false;
-      stopTimer();
-      lastRecordedMs = Date.now() - startTs;
-      recordingActive = false;
-      mediaRecorder.stop();
-    }} catch (err) {{
-      console.error(err);
-      alert('Stop failed: ' + err);
-    }}
-  }});
-
-  saveBtn.addEventListener('click', async () => {{
-    try {{
-      if (!lastBlob) {{
-        alert('Nothing to save yet. Record and stop first.');
-        return;
-      }}
-      saveBtn.disabled = true;
-      await uploadBlob(lastBlob);
-    }} catch (err) {{
-      console.error(err);
-      setStatus('Error');
-      alert('Save failed: ' + err);
-      saveBtn.disabled = false;
-    }}
-  }});
-
-  playBtn.addEventListener('click', () => {{
-    if (!lastMp3Url) return;
-    player.play();
-  }});
-
-  setStatus('Idle');
-  lastDuration.textContent = 'None';
-  downloadStatus.textContent = 'Not downloaded';
-
-  aboutBtn.addEventListener('click', openAbout);
-  aboutCloseBtn.addEventListener('click', closeAbout);
-  aboutBackdrop.addEventListener('click', (e) => {{
-    if (e.target === aboutBackdrop) closeAbout();
-  }});
-  settingsBtn.addEventListener('click', openSettings);
-  settingsCloseBtn.addEventListener('click', closeSettings);
-  settingsBackdrop.addEventListener('click', (e) => {{
-    if (e.target === settingsBackdrop) closeSettings();
-  }});
-  autoUploadGcs.addEventListener('change', () => {{
-    if (!autoUploadGcs.checked) autoGcsIndicator.style.display = 'none';
-  }});
-  autoTranscribe.addEventListener('change', () => {{
-    if (!autoTranscribe.checked) autoTranscribeIndicator.style.display = 'none';
-  }});
-  window.addEventListener('keydown', (e) => {{
-    if (e.key === 'Escape') {{
-      closeAbout();
-      closeSettings();
-    }}
-  }});
-
-  // Keyboard shortcuts
-  window.addEventListener('keydown', async (e) => {{
-    if (e.ctrlKey && (e.key === 's' || e.key === 'S')) {{
-      e.preventDefault();
-      if (!saveBtn.disabled) saveBtn.click();
-      return;
-    }}
-
-    if (e.code === 'Space') {{
-      const tag = (e.target && e.target.tagName) ? e.target.tagName.toLowerCase() : '';
-      if (tag === 'input' || tag === 'textarea' || tag === 'select') return;
-      e.preventDefault();
-      if (!startBtn.disabled) startBtn.click();
-      else if (!stopBtn.disabled) stopBtn.click();
-    }}
-  }});
-
-  // Player scrub timeline
-  player.addEventListener('loadedmetadata', () => {{
-    scrub.max = player.duration || 0;
-    scrub.value = 0;
-    scrubWrap.style.display = 'block';
-    scrubLabel.textContent = `00:00 / ${{fmtTime(Math.floor((player.duration || 0) * 1000))}}`;
-  }});
-  player.addEventListener('timeupdate', () => {{
-    if (!isFinite(player.duration) || player.duration <= 0) return;
-    scrub.max = player.duration;
-    scrub.value = player.currentTime;
-    scrubLabel.textContent = `${{fmtTime(Math.floor(player.currentTime * 1000))}} / ${{fmtTime(Math.floor(player.duration * 1000))}}`;
-  }});
-  scrub.addEventListener('input', () => {{
-    player.currentTime = parseFloat(scrub.value || '0');
-  }});
-</script>
 </body>
 </html>"""
+# Encoded once here; passing the str to HTMLResponse would re-encode it on every request.
+_INDEX_BYTES = _INDEX_HTML.encode("utf-8")
+_INDEX_GZ = gzip.compress(_INDEX_BYTES, 9)
+_INDEX_HEADERS = {"Cache-Control": "public, max-age=3600", "Vary": "Accept-Encoding"}
+_INDEX_GZ_HEADERS = {**_INDEX_HEADERS, "Content-Encoding": "gzip"}
 
 
-@app.get("/api/health")
-def health() -> dict[str, Any]:
-    return {"ok": True, "ffmpeg": _ffmpeg_bin()}
+@app.api_route("/", methods=["GET", "HEAD"], response_class=HTMLResponse)
+def index(request: Request) -> Response:
+    # The page is static after import, so only the response wrapper is per-request.
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        return Response(_INDEX_GZ, media_type="text/html", headers=_INDEX_GZ_HEADERS)
+    return HTMLResponse(_INDEX_BYTES, headers=_INDEX_HEADERS)
 
 
-@app.post("/api/upload")
-async def upload(
-    file: UploadFile = File(...),
-    name_base: str | None = Form(None),
-    trim_start: float | None = Form(None),
-    trim_end: float | None = Form(None),
-    auto_upload_gcs: str | None = Form(None),
-    auto_transcribe: str | None = Form(None),
-) -> JSONResponse:
-    if not file.filename:
-        raise HTTPException(status_code=400, detail="missing filename")
-
-    base = _safe_stem(name_base or Path(file.filename).stem or "recording")
-    stem = _timestamp_name(base)
-
-    original_ext = (Path(file.filename).suffix or ".bin").lower()
-    original_name = f"{stem}{original_ext}"
-    original_path = RECORDINGS_DIR / original_name
-
-    content = await file.read()
-    if not content:
-        raise HTTPException(status_code=400, detail="empty upload")
-    original_path.write_bytes(content)
-
-    # Convert to MP3
-    mp3_name = f"{stem}.mp3"
-    mp3_path = RECORDINGS_DIR / mp3_name
+@app.get("/api/health")
+def health() -> dict[str, Any]:
+    # The encode counters are per process; with several workers they describe whichever one answered.
+    return {
+        "ok": True,
+        "ffmpeg": _ffmpeg_bin(),
+        "encodes_in_flight": _encodes_in_flight,
+        "max_parallel_encodes": MAX_PARALLEL_ENCODES,
+        "workers": WORKERS,
+    }
+
+
+async def _save_recording(
+    chunks: AsyncIterator[bytes],
+    filename: str,
+    name_base: str | None,
+    trim_start: float | None,
+    trim_end: float | None,
+    auto_upload_gcs: str | None,
+    auto_transcribe: str | None,
+    output_format: str | None,
+    source_sha256: str | None = None,
+) -> dict[str, Any]:
+    """Store a recording, convert it, run the optional auto steps and build the response.
+
+    A take whose bytes and settings match an earlier save reuses that save's files and
+    skips the auto steps it already ran, without running ffmpeg. Dedupe needs the caller to
+    pass ``source_sha256`` (the source is already on disk by then); without it every take is saved.
+    """
+    global _encodes_in_flight
+    base = _safe_stem(name_base or Path(filename).stem or "recording")
+
+    output_format = (output_format or "ogg").lower()
+    if output_format not in ("ogg", "mp3"):
+        raise HTTPException(status_code=400, detail="output_format must be 'ogg' or 'mp3'")
+
+    original_ext = (Path(filename).suffix or ".bin").lower()
+    # Ogg is a pure remux of the browser's Opus stream. Other sources (e.g. Safari's AAC)
+    # are encoded to Opus, which is much cheaper than MP3; MP3 is used when asked for or
+    # when this ffmpeg build has no libopus.
+    remux = output_format == "ogg" and original_ext in _OGG_REMUXABLE
+    to_opus = (
+        output_format == "ogg"
+        and not remux
+        and " libopus " in await asyncio.to_thread(_ffmpeg_encoders)
+    )
+    output_ext = ".ogg" if remux or to_opus else ".mp3"
 
     if trim_start is not None and trim_start < 0:
         raise HTTPException(status_code=400, detail="trim_start must be >= 0")
@@ -944,89 +647,287 @@ async def upload(
     if trim_start is not None and trim_end is not None and trim_end <= trim_start:
         raise HTTPException(status_code=400, detail="trim_end must be > trim_start")
 
+    key_params = f"{original_ext}:{output_ext}:{trim_start}:{trim_end}"
+    dedupe_key = None
+    if source_sha256 is not None:
+        dedupe_key = f"{source_sha256}:{key_params}"
+        cached = await asyncio.to_thread(_dedupe_lookup, dedupe_key)
+        if cached is not None:
+            await _run_auto_steps(cached, auto_upload_gcs, auto_transcribe)
+            await asyncio.to_thread(_dedupe_store, dedupe_key, cached)
+            return cached
+
+    first_chunk = await anext(chunks, b"")
+    if not first_chunk:
+        raise HTTPException(status_code=400, detail="empty upload")
+
     ffmpeg = _ffmpeg_bin()
     ffmpeg_cmd = [
         ffmpeg,
         "-y",
         "-v",
         "error",
-        "-i",
-        str(original_path),
     ]
 
-    if trim_start is not None:
-        ffmpeg_cmd.extend(["-ss", f"{trim_start}"])
+    copy = remux or original_ext == output_ext
+    seek = ["-ss", f"{trim_start}"] if trim_start is not None else []
+    # Trims: re-encodes put -ss before -i, so the prefix is discarded after decoding and never
+    # resampled or encoded (output-side -ss would encode it and throw it away). The upload is a
+    # pipe, so ffmpeg cannot seek the container in either case. Stream copies put -ss after -i:
+    # an input-side seek on an Ogg pipe leaves the copied packets with negative granule
+    # positions, giving an undecodable file of the wrong length. Copies cut on packet
+    # boundaries (20 ms for Opus), so they are not sample-accurate.
+    if not copy:
+        ffmpeg_cmd.extend(seek)
+    ffmpeg_cmd.extend(["-i", "pipe:0"])
+    if copy:
+        ffmpeg_cmd.extend(seek)
     if trim_end is not None:
         duration = trim_end - (trim_start or 0.0)
         ffmpeg_cmd.extend(["-t", f"{duration}"])
 
-    try:
-        subprocess.run(
+    if copy:
+        # Copy the compressed stream as-is instead of decoding and re-encoding it.
+        ffmpeg_cmd.extend(["-vn", "-codec:a", "copy"])
+    elif to_opus:
+        # Same bitrate as the browser's WebCodecs encoder.
+        ffmpeg_cmd.extend(["-vn", "-ac", "1", "-codec:a", "libopus", "-b:a", "64k"])
+    else:
+        encoder = await asyncio.to_thread(_mp3_encoder)
+        if encoder == "libshine":
+            quality = ["-b:a", "128k"]  # libshine is CBR only
+        else:
+            # VBR V4: fine for voice and faster than V3. LAME's q<=3 settings also take an
+            # unoptimized noise_shaping_amp path (HydrogenAudio report on LAME 3.100).
+            quality = ["-qscale:a", "4"]
+        ffmpeg_cmd.extend(
             [
-                *ffmpeg_cmd,
                 "-vn",
                 "-ac",
                 "1",
                 "-ar",
                 "44100",
                 "-codec:a",
-                "libmp3lame",
-                "-qscale:a",
-                "3",
-                str(mp3_path),
-            ],
-            check=True,
+                encoder,
+                *quality,
+            ]
         )
-    except FileNotFoundError as exc:
-        raise HTTPException(status_code=500, detail=f"ffmpeg not found: {exc}") from exc
-    except subprocess.CalledProcessError as exc:
-        raise HTTPException(status_code=500, detail=f"ffmpeg failed: {exc}") from exc
+
+    original_name, output_name = _reserve_names(base, original_ext, output_ext)
+    original_path = RECORDINGS_DIR / original_name
+    output_path = RECORDINGS_DIR / output_name
+    ffmpeg_cmd.append(str(output_path))
+
+    try:
+        async with _ENCODE_SEM:
+            _encodes_in_flight += 1
+            # Only a single-worker server with no other encode in flight can give ffmpeg every
+            # core. _encodes_in_flight counts this process only, so with several workers each
+            # ffmpeg keeps one thread to avoid oversubscribing the CPU.
+            lone_encode = WORKERS == 1 and _encodes_in_flight == 1
+            ffmpeg_cmd[1:1] = ["-threads", "0" if lone_encode else "1"]
+            try:
+                returncode, stderr = await _tee_to_ffmpeg(chunks, first_chunk, original_path, ffmpeg_cmd)
+            except FileNotFoundError as exc:
+                raise HTTPException(status_code=500, detail=f"ffmpeg not found: {exc}") from exc
+            finally:
+                _encodes_in_flight -= 1
+        if returncode != 0:
+            detail = stderr.decode("utf-8", "replace").strip() or f"exit status {returncode}"
+            raise HTTPException(status_code=500, detail=f"ffmpeg failed: {detail}")
+    except BaseException:
+        # Don't leave a half-written source or output in the served recordings folder.
+        original_path.unlink(missing_ok=True)
+        output_path.unlink(missing_ok=True)
+        raise
+
+    result = {
+        "original_filename": original_name,
+        "output_filename": output_name,
+        "original_url": f"/recordings/{original_name}",
+        "output_url": f"/recordings/{output_name}",
+        "format": output_ext.lstrip("."),
+        # Kept for clients that only understand the MP3 response.
+        "mp3_filename": output_name if output_ext == ".mp3" else None,
+        "mp3_url": f"/recordings/{output_name}" if output_ext == ".mp3" else None,
+        "auto_gcs_uploaded": False,
+        "auto_transcribed": False,
+    }
+    await _run_auto_steps(result, auto_upload_gcs, auto_transcribe)
+    if dedupe_key is not None:
+        await asyncio.to_thread(_dedupe_store, dedupe_key, result)
+    return result
+
+
+async def _run_auto_steps(result: dict[str, Any], auto_upload_gcs: str | None, auto_transcribe: str | None) -> None:
+    """Run the requested GCS upload / transcription unless this output already had it."""
+    output_name = result["output_filename"]
+    output_path = RECORDINGS_DIR / output_name
 
     # Auto-upload to GCS if requested
-    auto_gcs_uploaded = False
-    auto_transcribed = False
-    if auto_upload_gcs == "1":
+    if auto_upload_gcs == "1" and not result["auto_gcs_uploaded"]:
         try:
-            from google.cloud import storage as gcs
-            client = gcs.Client()
             bucket_name = os.getenv("GOOGLE_CLOUD_BUCKET")
             if bucket_name:
-                bucket = client.bucket(bucket_name)
-                blob = bucket.blob(mp3_name)
-                blob.upload_from_filename(str(mp3_path))
-                auto_gcs_uploaded = True
+                bucket = _gcs_client().bucket(bucket_name)
+                blob = bucket.blob(output_name)
+                await asyncio.to_thread(blob.upload_from_filename, str(output_path))
+                result["auto_gcs_uploaded"] = True
         except ImportError:
             print("Google Cloud Storage library not installed; skipping auto-upload.", file=sys.stderr)
         except OSError as e:
             # Log but don't fail the whole request
             print(f"Auto GCS upload failed: {e}", file=sys.stderr)
 
-    # Auto-transcribe with gc_stt.py if requested
-    if auto_transcribe == "1":
+    # Auto-transcribe with gc_stt in-process; the operation is polled, not waited on in a thread
+    if auto_transcribe == "1" and not result["auto_transcribed"]:
         try:
-            result = subprocess.run(
-                [sys.executable, str(BASE_DIR / "gc_stt.py"), str(mp3_path)],
-                capture_output=True,
-                text=True,
-                check=False,
-            )
-            if result.returncode == 0:
-                auto_transcribed = True
+            import gc_stt
+        except ImportError:
+            print("Google Cloud Speech library not installed; skipping auto-transcribe.", file=sys.stderr)
+        else:
+            if not gc_stt.PROJECT_ID or not gc_stt.DEFAULT_BUCKET:
+                print(
+                    "GOOGLE_CLOUD_PROJECT and GOOGLE_CLOUD_BUCKET must be set; skipping auto-transcribe.",
+                    file=sys.stderr,
+                )
             else:
-                print(f"Auto transcription failed: {result.stderr}", file=sys.stderr)
-        except (OSError, subprocess.SubprocessError) as e:
-            print(f"Auto transcription error: {e}", file=sys.stderr)
-
-    return JSONResponse(
-        {
-            "original_filename": original_name,
-            "mp3_filename": mp3_name,
-            "original_url": f"/recordings/{original_name}",
-            "mp3_url": f"/recordings/{mp3_name}",
-            "auto_gcs_uploaded": auto_gcs_uploaded,
-            "auto_transcribed": auto_transcribed,
-        }
+                try:
+                    await gc_stt.transcribe_long_audio_async(str(output_path), gc_stt.DEFAULT_BUCKET)
+                    result["auto_transcribed"] = True
+                except Exception as e:
+                    # Log but don't fail the whole request
+                    print(f"Auto transcription failed: {e}", file=sys.stderr)
+
+
+@app.post("/api/upload")
+async def upload(
+    file: UploadFile = File(...),
+    name_base: str | None = Form(None),
+    trim_start: float | None = Form(None),
+    trim_end: float | None = Form(None),
+    auto_upload_gcs: str | None = Form(None),
+    auto_transcribe: str | None = Form(None),
+    output_format: str | None = Form(None),
+) -> JSONResponse:
+    if not file.filename:
+        raise HTTPException(status_code=400, detail="missing filename")
+    # Starlette has already spooled the body, so hash it up front and skip ffmpeg on a repeat.
+    source_sha256 = await asyncio.to_thread(_sha256_upload, file.file)
+    result = await _save_recording(
+        _upload_chunks(file),
+        file.filename,
+        name_base,
+        trim_start,
+        trim_end,
+        auto_upload_gcs,
+        auto_transcribe,
+        output_format,
+        source_sha256,
     )
+    return _FastJSONResponse(result)
+
+
+def _session_dir(sid: str) -> Path:
+    try:
+        return PARTIAL_DIR / str(uuid.UUID(sid))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail="invalid session id") from exc
+
+
+@app.post("/api/upload_chunk")
+async def upload_chunk(request: Request, sid: str, seq: int) -> JSONResponse:
+    """Store one MediaRecorder timeslice while the recording is still running."""
+    if seq < 0:
+        raise HTTPException(status_code=400, detail="seq must be >= 0")
+    session_dir = _session_dir(sid)
+    if seq == 0:
+        await asyncio.to_thread(_prune_stale_sessions)
+        session_dir.mkdir(exist_ok=True)
+    elif not session_dir.is_dir():
+        raise HTTPException(status_code=404, detail="unknown session")
+
+    # Stream the body to a temp file and rename it, so finalize never sees a half-written part.
+    part = session_dir / f"{seq:06d}.part"
+    tmp = part.with_suffix(".tmp")
+    size = 0
+    with tmp.open("wb") as out:
+        async for chunk in request.stream():
+            size += len(chunk)
+            await asyncio.to_thread(out.write, chunk)
+    if not size:
+        tmp.unlink()
+        raise HTTPException(status_code=400, detail="empty chunk")
+    tmp.replace(part)
+    return _FastJSONResponse({"sid": sid, "seq": seq, "size": size})
+
+
+@app.post("/api/finalize")
+async def finalize(
+    sid: str = Form(...),
+    ext: str = Form("webm"),
+    name_base: str | None = Form(None),
+    trim_start: float | None = Form(None),
+    trim_end: float | None = Form(None),
+    auto_upload_gcs: str | None = Form(None),
+    auto_transcribe: str | None = Form(None),
+    output_format: str | None = Form(None),
+) -> JSONResponse:
+    """Assemble a streamed session in order and convert it like a regular upload."""
+    session_dir = _session_dir(sid)
+    if not session_dir.is_dir():
+        raise HTTPException(status_code=404, detail="unknown session")
+    if not re.fullmatch(r"[A-Za-z0-9]{1,8}", ext):
+        raise HTTPException(status_code=400, detail="invalid ext")
+
+    parts = _session_parts(session_dir)
+    # Hash the raw parts (not the Ogg mux, whose stream serial is random) for dedupe.
+    source_sha256 = await asyncio.to_thread(_sha256_files, parts)
+    chunks = _session_chunks(parts)
+    if ext == OPUS_PACKET_EXT:
+        chunks = _ogg_opus_stream(chunks)
+        ext = "ogg"
+    result = await _save_recording(
+        chunks,
+        f"{name_base or 'recording'}.{ext}",
+        name_base,
+        trim_start,
+        trim_end,
+        auto_upload_gcs,
+        auto_transcribe,
+        output_format,
+        source_sha256,
+    )
+    for leftover in session_dir.iterdir():
+        leftover.unlink(missing_ok=True)
+    session_dir.rmdir()
+    return _FastJSONResponse(result)
+
+
+@app.post("/api/transcribe_batch")
+async def transcribe_batch(filenames: list[str] = Form(...)) -> JSONResponse:
+    """Transcribe several saved recordings with one BatchRecognize operation."""
+    paths = []
+    for name in filenames:
+        path = RECORDINGS_DIR / name
+        if Path(name).name != name or not path.is_file():
+            raise HTTPException(status_code=404, detail=f"unknown recording: {name}")
+        paths.append(str(path))
+
+    try:
+        import gc_stt
+    except ImportError as exc:
+        raise HTTPException(status_code=500, detail="Google Cloud Speech library not installed") from exc
+    if not gc_stt.PROJECT_ID or not gc_stt.DEFAULT_BUCKET:
+        raise HTTPException(status_code=500, detail="GOOGLE_CLOUD_PROJECT and GOOGLE_CLOUD_BUCKET must be set")
+    if len(paths) > gc_stt.MAX_BATCH_FILES:
+        raise HTTPException(status_code=400, detail=f"at most {gc_stt.MAX_BATCH_FILES} files per batch")
+
+    try:
+        results = await gc_stt.transcribe_batch_async(paths, gc_stt.DEFAULT_BUCKET)
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=f"transcription failed: {exc}") from exc
+    return _FastJSONResponse({"transcripts": {Path(path).name: text for path, text in results.items()}})
 
 
 def main() -> int:
@@ -1034,6 +935,9 @@ def main() -> int:
 
     Usage:
         .venv/bin/python audio_recorder.py
+
+    Runs a single worker, which spreads encodes over every core; set AUDIO_RECORDER_WORKERS
+    for more. uvicorn picks uvloop and httptools automatically when they are installed.
     """
     try:
         import uvicorn
@@ -1047,6 +951,7 @@ def main() -> int:
         host="127.0.0.1",
         port=8000,
         reload=False,
+        workers=WORKERS,
     )
     return 0
 
@@ -10,26 +10,37 @@ Date: Jan 4, 2025
 import sounddevice as sd
 import numpy as np
 import datetime
-import os
 import time
-from pydub import AudioSegment
-from scipy.io.wavfile import write as wavwrite
+import lameenc
+
+# Frames handed to the MP3 encoder per call (~1.5 s of 44.1 kHz audio)
+ENCODE_CHUNK_FRAMES = 64 * 1024
 
 
 def record_audio(duration=10, rate=44100, channels=1, dtype=np.int16):
     """Record audio from the microphone."""
     print(f"Recording for {duration} seconds...")
     print("Press Ctrl+C to stop recording early")
-    
+
+    # Blocks are collected as they arrive, so memory grows with what was actually
+    # recorded and stopping early keeps everything captured so far.
+    blocks = []
+
+    def callback(indata, frames, time_info, status):
+        if status:
+            print(status)
+        blocks.append(indata.copy())  # the callback is the only writer; list.append is enough
+
     try:
-        # Record audio
-        audio_data = sd.rec(int(duration * rate), samplerate=rate, 
-                           channels=channels, dtype=dtype)
-        sd.wait()  # Wait until recording is finished
-        return audio_data
+        with sd.InputStream(samplerate=rate, channels=channels, dtype=dtype,
+                            blocksize=1024, callback=callback):
+            sd.sleep(int(duration * 1000))
     except KeyboardInterrupt:
         print("\nRecording stopped by user")
+
+    if not blocks:
         return None
+    return np.concatenate(blocks, axis=0)
 
 
 def save_recording(audio_data, rate=44100):
@@ -40,18 +51,26 @@ def save_recording(audio_data, rate=44100):
     try:
         # Generate filename with timestamp
         timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        wav_filename = f"recording_{timestamp}.wav"
         mp3_filename = f"recording_{timestamp}.mp3"
-        
-        # Save as WAV first
-        wavwrite(wav_filename, rate, audio_data)
-        
-        # Convert to MP3
-        audio = AudioSegment.from_wav(wav_filename)
-        audio.export(mp3_filename, format="mp3")
-        
-        # Remove temporary WAV file
-        os.remove(wav_filename)
+
+        # LAME takes 16-bit PCM; scale float recordings instead of truncating them
+        if np.issubdtype(audio_data.dtype, np.floating):
+            audio_data = np.clip(audio_data, -1.0, 1.0) * 32767
+        pcm = np.ascontiguousarray(audio_data, dtype=np.int16)
+
+        # Encode the buffer in-process; no temporary WAV file and no ffmpeg fork
+        encoder = lameenc.Encoder()
+        encoder.set_in_sample_rate(rate)
+        encoder.set_channels(pcm.shape[1] if pcm.ndim > 1 else 1)
+        encoder.set_bit_rate(128)
+        # LAME uses an unoptimized noise-shaping path at q<=3 in CBR; q4 is faster and sounds as good
+        encoder.set_quality(4)
+        # Feed row slices of the array itself (lameenc reads their buffer without a
+        # copy) and write as we go, so no second full-size copy is ever built.
+        with open(mp3_filename, "wb") as f:
+            for start in range(0, len(pcm), ENCODE_CHUNK_FRAMES):
+                f.write(encoder.encode(pcm[start:start + ENCODE_CHUNK_FRAMES]))
+            f.write(encoder.flush())
         
         print(f"Recording saved as {mp3_filename}")
         return mp3_filename
@@ -5,7 +5,12 @@ Date: Jan 4, 2025
 """
 
 import argparse
+import asyncio
+import functools
 import os
+import re
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from uuid import uuid4
 
 try:
@@ -14,61 +19,181 @@ try:
 except ImportError:
     pass  # dotenv is optional
 
+from google.api_core.exceptions import NotFound
 from google.cloud import storage
+from google.cloud.storage import transfer_manager
+
+try:
+    from google.cloud.storage.exceptions import InvalidResponse
+except ImportError:  # google-cloud-storage < 3 still raises the resumable-media class
+    from google.resumable_media import InvalidResponse
 from google.cloud.speech_v2 import SpeechClient
 from google.cloud.speech_v2.types import cloud_speech
 
 PROJECT_ID = os.getenv("GOOGLE_CLOUD_PROJECT")
 DEFAULT_BUCKET = os.getenv("GOOGLE_CLOUD_BUCKET")
 
+# Files at least this large are uploaded as parallel ranges; below it a single PUT is faster.
+PARALLEL_UPLOAD_THRESHOLD = 16 * 1024 * 1024
+PARALLEL_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+PARALLEL_UPLOAD_WORKERS = 8
+
+# BatchRecognize accepts at most this many files per request.
+MAX_BATCH_FILES = 15
+
+# Clips within the synchronous Recognize limits skip GCS and the long-running operation.
+SHORT_AUDIO_MAX_S = 60
+SHORT_AUDIO_MAX_BYTES = 10 * 1024 * 1024
+_DURATION_RE = re.compile(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)")
+
+
+@functools.lru_cache(maxsize=None)
+def _storage_client(project_id: str) -> storage.Client:
+    """Shared (thread-safe) client, so auth discovery and TLS setup happen once per project."""
+    return storage.Client(project=project_id)
+
+
+@functools.lru_cache(maxsize=1)
+def _speech_client() -> SpeechClient:
+    """Shared Speech client; the web server calls transcribe_long_audio repeatedly in-process."""
+    return SpeechClient()
+
+
+def _missing_bucket(bucket_name: str, project_id: str) -> RuntimeError:
+    return RuntimeError(f"Bucket '{bucket_name}' does not exist or is not accessible in project '{project_id}'.")
+
 
 def upload_to_gcs(local_path: str, bucket_name: str, project_id: str) -> str:
     """Upload a local audio file to Cloud Storage and return the gs:// URI."""
-    client = storage.Client(project=project_id)
-    bucket = client.bucket(bucket_name)
-    if not bucket.exists():
-        raise RuntimeError(
-            f"Bucket '{bucket_name}' does not exist or is not accessible in project '{project_id}'."
-        )
-
+    bucket = _storage_client(project_id).bucket(bucket_name)
     blob_name = f"uploads/{uuid4()}_{os.path.basename(local_path)}"
     blob = bucket.blob(blob_name)
-    blob.upload_from_filename(local_path)
+    if os.path.getsize(local_path) >= PARALLEL_UPLOAD_THRESHOLD:
+        try:
+            # Threads, not processes: this also runs inside the web server's worker threads.
+            transfer_manager.upload_chunks_concurrently(
+                local_path,
+                blob,
+                chunk_size=PARALLEL_UPLOAD_CHUNK_SIZE,
+                max_workers=PARALLEL_UPLOAD_WORKERS,
+                worker_type=transfer_manager.THREAD,
+            )
+        except InvalidResponse as exc:
+            # The XML multipart upload reports a missing bucket as a bare 404 response, not NotFound.
+            if getattr(exc.response, "status_code", None) != 404:
+                raise
+            raise _missing_bucket(bucket_name, project_id) from exc
+    else:
+        try:
+            blob.upload_from_filename(local_path)
+        except NotFound as exc:
+            raise _missing_bucket(bucket_name, project_id) from exc
     return f"gs://{bucket_name}/{blob_name}"
 
 
-def transcribe_long_audio(input_file: str, bucket_name: str) -> cloud_speech.BatchRecognizeResponse:
-    """Transcribe long audio using BatchRecognize with inline results."""
-    gcs_uri = upload_to_gcs(input_file, bucket_name, PROJECT_ID)
-    print(f"Uploaded audio to {gcs_uri}")
-
-    client = SpeechClient()
-
-    config = cloud_speech.RecognitionConfig(
+def _recognition_config(model: str) -> cloud_speech.RecognitionConfig:
+    return cloud_speech.RecognitionConfig(
         auto_decoding_config=cloud_speech.AutoDetectDecodingConfig(),
         language_codes=["en-US"],
-        model="long",
+        model=model,
     )
 
-    file_metadata = cloud_speech.BatchRecognizeFileMetadata(
-        uri=gcs_uri,
-    )
+
+def _batch_recognize_request(gcs_uris: list[str]) -> cloud_speech.BatchRecognizeRequest:
+    """BatchRecognize request for the given gs:// URIs with inline results."""
+    config = _recognition_config("long")
 
     output_config = cloud_speech.RecognitionOutputConfig(
         inline_response_config=cloud_speech.InlineOutputConfig()
     )
 
-    request = cloud_speech.BatchRecognizeRequest(
+    return cloud_speech.BatchRecognizeRequest(
         recognizer=f"projects/{PROJECT_ID}/locations/global/recognizers/_",
         config=config,
-        files=[file_metadata],
+        files=[cloud_speech.BatchRecognizeFileMetadata(uri=uri) for uri in gcs_uris],
         recognition_output_config=output_config,
     )
 
-    operation = client.batch_recognize(request=request)
-    print("Waiting for transcription operation to complete...")
-    response = operation.result(timeout=3600)
 
+def _audio_duration(path: str) -> float | None:
+    """Clip length in seconds from ffmpeg's header probe, or None if it can't be determined."""
+    # Same binary lookup as audio_recorder: the bundled ./ffmpeg, else PATH (there is no ffprobe).
+    local = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ffmpeg")
+    ffmpeg = local if os.access(local, os.X_OK) else "ffmpeg"
+    try:
+        result = subprocess.run(
+            [ffmpeg, "-hide_banner", "-i", path],
+            capture_output=True,
+            text=True,
+            check=False,  # exits non-zero because no output is given
+        )
+    except OSError:
+        return None
+    match = _DURATION_RE.search(result.stderr)
+    if not match:
+        return None
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def _is_short_clip(path: str) -> bool:
+    if os.path.getsize(path) > SHORT_AUDIO_MAX_BYTES:
+        return False
+    duration = _audio_duration(path)
+    return duration is not None and duration < SHORT_AUDIO_MAX_S
+
+
+def transcribe_short_audio(input_file: str, verbose: bool = False) -> cloud_speech.RecognizeResponse:
+    """Transcribe a clip under a minute with one synchronous Recognize call (no GCS upload).
+
+    With ``verbose`` the segments are printed; the web server leaves it off so transcripts
+    stay out of its logs.
+    """
+    with open(input_file, "rb") as f:
+        content = f.read()
+
+    request = cloud_speech.RecognizeRequest(
+        recognizer=f"projects/{PROJECT_ID}/locations/global/recognizers/_",
+        config=_recognition_config("short"),
+        content=content,
+    )
+    response = _speech_client().recognize(request=request)
+    if verbose:
+        _print_segments(response.results)
+    return response
+
+
+OPERATION_TIMEOUT_S = 3600
+
+
+async def _wait_for_operation(operation, timeout: float = OPERATION_TIMEOUT_S):
+    """Await a long-running operation by polling with backoff instead of blocking a thread.
+
+    Each done() call is a short GetOperation RPC, so only that runs in a worker thread.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    delay = 0.5
+    while not await asyncio.to_thread(operation.done):
+        if loop.time() >= deadline:
+            raise TimeoutError(f"Transcription did not finish within {timeout:.0f} s.")
+        await asyncio.sleep(delay)
+        delay = min(delay * 1.5, 5.0)
+    return operation.result()
+
+
+def _print_segments(results) -> None:
+    if not results:
+        print("No transcript text returned.")
+    for idx, result in enumerate(results, start=1):
+        if result.alternatives:
+            print(f"[Segment {idx}] {result.alternatives[0].transcript}")
+
+
+def _report_transcript(
+    response: cloud_speech.BatchRecognizeResponse, verbose: bool
+) -> cloud_speech.BatchRecognizeResponse:
+    """Raise on a failed single-file result, otherwise print its segments if ``verbose``."""
     if not response.results:
         raise RuntimeError("No transcription results returned.")
 
@@ -76,16 +201,106 @@ def transcribe_long_audio(input_file: str, bucket_name: str) -> cloud_speech.Bat
     if file_result.error and file_result.error.code:
         raise RuntimeError(f"Transcription failed for {file_key}: {file_result.error.message}")
 
-    inline_result = file_result.inline_result
-    if not inline_result or not inline_result.transcript.results:
-        print("No transcript text returned.")
-        return response
+    if verbose:
+        inline_result = file_result.inline_result
+        _print_segments(inline_result.transcript.results if inline_result else [])
+    return response
 
-    for idx, result in enumerate(inline_result.transcript.results, start=1):
-        if result.alternatives:
-            print(f"[Segment {idx}] {result.alternatives[0].transcript}")
 
-    return response
+def transcribe_long_audio(
+    input_file: str, bucket_name: str, verbose: bool = False
+) -> cloud_speech.BatchRecognizeResponse | cloud_speech.RecognizeResponse:
+    """Transcribe long audio using BatchRecognize with inline results.
+
+    Clips under SHORT_AUDIO_MAX_S go through transcribe_short_audio instead.
+    ``verbose`` prints progress and the transcript (the CLI turns it on).
+    """
+    if _is_short_clip(input_file):
+        return transcribe_short_audio(input_file, verbose)
+
+    gcs_uri = upload_to_gcs(input_file, bucket_name, PROJECT_ID)
+    if verbose:
+        print(f"Uploaded audio to {gcs_uri}")
+
+    client = _speech_client()
+    request = _batch_recognize_request([gcs_uri])
+
+    operation = client.batch_recognize(request=request)
+    if verbose:
+        print("Waiting for transcription operation to complete...")
+    response = operation.result(timeout=OPERATION_TIMEOUT_S)
+    return _report_transcript(response, verbose)
+
+
+async def transcribe_long_audio_async(
+    input_file: str, bucket_name: str, verbose: bool = False
+) -> cloud_speech.BatchRecognizeResponse | cloud_speech.RecognizeResponse:
+    """Async transcribe_long_audio: polls the operation instead of holding a thread for its duration."""
+    if await asyncio.to_thread(_is_short_clip, input_file):
+        return await asyncio.to_thread(transcribe_short_audio, input_file, verbose)
+
+    gcs_uri = await asyncio.to_thread(upload_to_gcs, input_file, bucket_name, PROJECT_ID)
+    if verbose:
+        print(f"Uploaded audio to {gcs_uri}")
+
+    request = _batch_recognize_request([gcs_uri])
+    operation = await asyncio.to_thread(_speech_client().batch_recognize, request=request)
+    if verbose:
+        print("Waiting for transcription operation to complete...")
+    response = await _wait_for_operation(operation)
+    return _report_transcript(response, verbose)
+
+
+def _upload_batch(input_files: list[str], bucket_name: str) -> list[str]:
+    """Upload the batch's files to GCS in parallel and return their gs:// URIs in order."""
+    if len(input_files) > MAX_BATCH_FILES:
+        raise ValueError(f"At most {MAX_BATCH_FILES} files can be transcribed in one batch.")
+    with ThreadPoolExecutor(max_workers=min(len(input_files), PARALLEL_UPLOAD_WORKERS)) as pool:
+        return list(pool.map(lambda path: upload_to_gcs(path, bucket_name, PROJECT_ID), input_files))
+
+
+def _batch_transcripts(
+    input_files: list[str], gcs_uris: list[str], response: cloud_speech.BatchRecognizeResponse
+) -> dict[str, str]:
+    transcripts = {}
+    for input_file, gcs_uri in zip(input_files, gcs_uris):
+        file_result = response.results.get(gcs_uri)
+        if file_result is None:
+            raise RuntimeError(f"No transcription result returned for {input_file}.")
+        if file_result.error and file_result.error.code:
+            raise RuntimeError(f"Transcription failed for {input_file}: {file_result.error.message}")
+        inline_result = file_result.inline_result
+        segments = inline_result.transcript.results if inline_result else []
+        transcripts[input_file] = " ".join(
+            result.alternatives[0].transcript.strip() for result in segments if result.alternatives
+        )
+    return transcripts
+
+
+def transcribe_batch(input_files: list[str], bucket_name: str) -> dict[str, str]:
+    """Transcribe up to MAX_BATCH_FILES files with a single BatchRecognize operation.
+
+    Returns a mapping of each input path to its transcript ("" when no speech was found).
+    """
+    if not input_files:
+        return {}
+    gcs_uris = _upload_batch(input_files, bucket_name)
+
+    operation = _speech_client().batch_recognize(request=_batch_recognize_request(gcs_uris))
+    response = operation.result(timeout=OPERATION_TIMEOUT_S)
+    return _batch_transcripts(input_files, gcs_uris, response)
+
+
+async def transcribe_batch_async(input_files: list[str], bucket_name: str) -> dict[str, str]:
+    """Async transcribe_batch: polls the operation instead of holding a thread for its duration."""
+    if not input_files:
+        return {}
+    gcs_uris = await asyncio.to_thread(_upload_batch, input_files, bucket_name)
+
+    request = _batch_recognize_request(gcs_uris)
+    operation = await asyncio.to_thread(_speech_client().batch_recognize, request=request)
+    response = await _wait_for_operation(operation)
+    return _batch_transcripts(input_files, gcs_uris, response)
 
 
 if __name__ == "__main__":
@@ -117,4 +332,4 @@ if __name__ == "__main__":
     print(f"Using project: {PROJECT_ID}")
     print(f"Uploading to bucket: {args.bucket}")
 
-    transcribe_long_audio(args.audio_file, args.bucket)
+    transcribe_long_audio(args.audio_file, args.bucket, verbose=True)
@@ -0,0 +1,697 @@
+const startBtn = document.getElementById('startBtn');
+const stopBtn = document.getElementById('stopBtn');
+const saveBtn = document.getElementById('saveBtn');
+const playBtn = document.getElementById('playBtn');
+const statusPill = document.getElementById('status');
+const timerPill = document.getElementById('timer');
+const canvas = document.getElementById('scope');
+const ctx = canvas.getContext('2d');
+const levelBar = document.getElementById('level');
+const latencyLabel = document.getElementById('latency');
+const nameBase = document.getElementById('nameBase');
+const lastSaved = document.getElementById('lastSaved');
+const lastDuration = document.getElementById('lastDuration');
+const downloadStatus = document.getElementById('downloadStatus');
+const autoStatus = document.getElementById('autoStatus');
+const deviceSelect = document.getElementById('deviceSelect');
+const gateEnabled = document.getElementById('gateEnabled');
+const gateThreshold = document.getElementById('gateThreshold');
+const gateHold = document.getElementById('gateHold');
+const trimStart = document.getElementById('trimStart');
+const trimEnd = document.getElementById('trimEnd');
+const outputFormat = document.getElementById('outputFormat');
+const links = document.getElementById('links');
+const player = document.getElementById('player');
+const scrubWrap = document.getElementById('scrubWrap');
+const scrub = document.getElementById('scrub');
+const scrubLabel = document.getElementById('scrubLabel');
+const aboutBtn = document.getElementById('aboutBtn');
+const aboutBackdrop = document.getElementById('aboutBackdrop');
+const aboutCloseBtn = document.getElementById('aboutCloseBtn');
+const settingsBtn = document.getElementById('settingsBtn');
+const settingsBackdrop = document.getElementById('settingsBackdrop');
+const settingsCloseBtn = document.getElementById('settingsCloseBtn');
+const autoUploadGcs = document.getElementById('autoUploadGcs');
+const autoTranscribe = document.getElementById('autoTranscribe');
+const autoGcsIndicator = document.getElementById('autoGcsIndicator');
+const autoTranscribeIndicator = document.getElementById('autoTranscribeIndicator');
+const mainAutoGcsIndicator = document.getElementById('mainAutoGcsIndicator');
+const mainAutoTranscribeIndicator = document.getElementById('mainAutoTranscribeIndicator');
+const gateWorkletUrl = document.currentScript.dataset.gateWorklet;
+
+const SCOPE_FRAME_MS = 33; // ~30 fps is plenty for the scope and meter
+
+const CHUNK_MS = 1000; // MediaRecorder timeslice streamed to the server while recording
+
+let mediaRecorder;
+let session;
+let lastSession;
+let audioCtx;
+let analyser;
+let gateNode;
+let source;
+let dataArray;
+let rafId;
+let lastDrawTs = 0;
+let scopeIdle = false;
+let startTs;
+let timerId;
+let lastOutputUrl;
+let lastRecordedMs;
+let stream;
+let recordingActive = false;
+let gatePaused = false;
+let silenceStartedAt = null;
+
+// MediaRecorder-compatible recorder that encodes Opus with WebCodecs from the
+// gate worklet's samples. Each timeslice is a Blob of raw packets, each
+// prefixed by two little-endian uint32s: byte length and duration in 48 kHz
+// samples. The server wraps them in Ogg, so there is no WebM container step
+// and no re-encode.
+class OpusPacketRecorder {
+  static config(sampleRate) {
+    return { codec: 'opus', sampleRate, numberOfChannels: 1, bitrate: 64000 };
+  }
+
+  static async isSupported(sampleRate) {
+    if (!window.AudioEncoder || !window.AudioData) return false;
+    try {
+      const { supported } = await AudioEncoder.isConfigSupported(OpusPacketRecorder.config(sampleRate));
+      return supported;
+    } catch (e) {
+      return false;
+    }
+  }
+
+  constructor(sampleRate) {
+    this.sampleRate = sampleRate;
+    this.mimeType = 'application/x-opus-packets';
+    this.state = 'inactive';
+    this.ondataavailable = null;
+    this.onstop = null;
+  }
+
+  start(timeslice) {
+    this.encoder = new AudioEncoder({
+      output: (chunk) => this.onPacket(chunk),
+      error: (e) => console.error('AudioEncoder error', e),
+    });
+    this.encoder.configure(OpusPacketRecorder.config(this.sampleRate));
+    this.frames = 0;
+    this.packets = [];
+    this.state = 'recording';
+    this.timer = setInterval(() => this.emit(), timeslice || 1000);
+  }
+
+  pause() {
+    if (this.state === 'recording') this.state = 'paused';
+  }
+
+  resume() {
+    if (this.state === 'paused') this.state = 'recording';
+  }
+
+  async stop() {
+    if (this.state === 'inactive') return;
+    this.state = 'inactive';
+    clearInterval(this.timer);
+    await this.encoder.flush();
+    this.encoder.close();
+    this.emit();
+    if (this.onstop) this.onstop();
+  }
+
+  pushSamples(samples) {
+    // Samples are dropped while paused, so the gate cuts silence exactly like MediaRecorder.pause().
+    if (this.state !== 'recording') return;
+    const data = new AudioData({
+      format: 'f32-planar',
+      sampleRate: this.sampleRate,
+      numberOfFrames: samples.length,
+      numberOfChannels: 1,
+      timestamp: Math.round(this.frames * 1e6 / this.sampleRate),
+      data: samples,
+    });
+    this.frames += samples.length;
+    this.encoder.encode(data);
+    data.close();
+  }
+
+  onPacket(chunk) {
+    const buf = new ArrayBuffer(8 + chunk.byteLength);
+    const view = new DataView(buf);
+    view.setUint32(0, chunk.byteLength, true);
+    view.setUint32(4, Math.round((chunk.duration || 20000) * 48 / 1000), true);
+    chunk.copyTo(new Uint8Array(buf, 8));
+    this.packets.push(buf);
+  }
+
+  emit() {
+    if (!this.packets.length || !this.ondataavailable) return;
+    const data = new Blob(this.packets, { type: this.mimeType });
+    this.packets = [];
+    this.ondataavailable({ data });
+  }
+}
+
+function openAbout() {
+  aboutBackdrop.classList.add('open');
+}
+
+function closeAbout() {
+  aboutBackdrop.classList.remove('open');
+}
+
+function openSettings() {
+  settingsBackdrop.classList.add('open');
+}
+
+function closeSettings() {
+  settingsBackdrop.classList.remove('open');
+}
+
+function setStatus(text) { statusPill.textContent = text; }
+
+function fmtTime(ms) {
+  const sec = Math.floor(ms/1000);
+  const m = String(Math.floor(sec/60)).padStart(2,'0');
+  const s = String(sec%60).padStart(2,'0');
+  const secsOnly = sec % 60;
+  return `${m}:${String(secsOnly).padStart(2,'0')} (${(ms/1000).toFixed(1)}s)`;
+}
+
+async function refreshDevices() {
+  try {
+    const devices = await navigator.mediaDevices.enumerateDevices();
+    const mics = devices.filter(d => d.kind === 'audioinput');
+    const current = deviceSelect.value;
+    deviceSelect.innerHTML = '<option value="">Default microphone</option>';
+    for (const d of mics) {
+      const opt = document.createElement('option');
+      opt.value = d.deviceId;
+      opt.textContent = d.label || `Microphone (${d.deviceId.slice(0,6)}…)`;
+      deviceSelect.appendChild(opt);
+    }
+    deviceSelect.value = current;
+  } catch (e) {
+    console.warn('enumerateDevices failed', e);
+  }
+}
+
+function triggerDownload(url, filename) {
+  // Browsers will save to the user’s default Downloads folder (or whatever they configured).
+  const a = document.createElement('a');
+  a.href = new URL(url, window.location.href).toString();
+  a.download = filename || '';
+  a.rel = 'noopener';
+  document.body.appendChild(a);
+  a.click();
+  a.remove();
+}
+
+const SAVE_TYPES = {
+  mp3: { description: 'MP3 Audio', accept: { 'audio/mpeg': ['.mp3'] } },
+  ogg: { description: 'Ogg Audio', accept: { 'audio/ogg': ['.ogg'] } },
+};
+
+async function saveWithPicker(url, filename, format) {
+  // If supported, prompt the user for a save location.
+  // Falls back to normal browser download if the API isn't available.
+  if (window.showSaveFilePicker) {
+    try {
+      const handle = await window.showSaveFilePicker({
+        suggestedName: filename || 'recording.mp3',
+        types: [SAVE_TYPES[format] || SAVE_TYPES.mp3]
+      });
+
+      const resp = await fetch(new URL(url, window.location.href).toString());
+      if (!resp.ok) throw new Error('Download failed: ' + resp.status);
+      const blob = await resp.blob();
+      const writable = await handle.createWritable();
+      await writable.write(blob);
+      await writable.close();
+      downloadStatus.textContent = 'Saved: ' + (filename || 'recording.mp3');
+      return; // Do not trigger fallback download
+    } catch (err) {
+      if (err && err.name === 'AbortError') {
+        downloadStatus.textContent = 'Save canceled';
+        return;
+      }
+      console.error(err);
+      downloadStatus.textContent = 'Save failed';
+      // Continue to fallback download.
+    }
+  }
+
+  // Fallback: normal browser download
+  triggerDownload(url, filename);
+  downloadStatus.textContent = 'Downloaded: ' + (filename || 'recording.mp3');
+}
+
+function updateLevel(rms) {
+  const pct = Math.min(1, rms*1.8);
+  levelBar.style.width = `${Math.floor(pct*100)}%`;
+}
+
+function gateSettings() {
+  return {
+    threshold: parseFloat(gateThreshold.value || '7') / 100.0,
+    holdMs: parseInt(gateHold.value || '800', 10),
+  };
+}
+
+// Noise gate / auto-pause on silence.
+function setGateOpen(open) {
+  if (!recordingActive || !mediaRecorder || !gateEnabled.checked) return;
+  if (!open && !gatePaused && mediaRecorder.state === 'recording' && mediaRecorder.pause) {
+    try {
+      mediaRecorder.pause();
+      gatePaused = true;
+      setStatus('Paused (silence)');
+    } catch (e) {
+      console.warn('pause failed', e);
+    }
+  } else if (open && gatePaused && mediaRecorder.state === 'paused' && mediaRecorder.resume) {
+    try {
+      mediaRecorder.resume();
+      gatePaused = false;
+      setStatus('Recording…');
+    } catch (e) {
+      console.warn('resume failed', e);
+    }
+  }
+}
+
+// Main-thread gate, used only when AudioWorklet is unavailable.
+function gateFromRms(rms) {
+  if (!recordingActive) return;
+  const { threshold, holdMs } = gateSettings();
+  if (rms < threshold) {
+    if (silenceStartedAt === null) silenceStartedAt = Date.now();
+    if ((Date.now() - silenceStartedAt) >= holdMs) setGateOpen(false);
+  } else {
+    silenceStartedAt = null;
+    setGateOpen(true);
+  }
+}
+
+function rmsOf(samples) {
+  let sum = 0;
+  for (let i=0;i<samples.length;i++) sum += samples[i]*samples[i];
+  return Math.sqrt(sum / samples.length);
+}
+
+function clearScope() {
+  ctx.fillStyle = '#0b1223';
+  ctx.fillRect(0,0,canvas.width,canvas.height);
+}
+
+function draw(ts) {
+  if (!analyser) return;
+  rafId = requestAnimationFrame(draw);
+  if (ts - lastDrawTs < SCOPE_FRAME_MS) return;
+  lastDrawTs = ts;
+
+  if (!recordingActive) {
+    // Idle: no waveform to paint; the meter alone shows the mic is live.
+    if (!scopeIdle) {
+      clearScope();
+      scopeIdle = true;
+    }
+    if (!gateNode) {
+      analyser.getFloatTimeDomainData(dataArray);
+      updateLevel(rmsOf(dataArray));
+    }
+    return;
+  }
+  scopeIdle = false;
+
+  analyser.getFloatTimeDomainData(dataArray);
+  clearScope();
+  ctx.lineWidth = 2;
+  ctx.strokeStyle = '#f97316';
+  ctx.beginPath();
+  const n = dataArray.length;
+  const halfH = canvas.height / 2;
+  const sliceWidth = canvas.width / n;
+  let x = 0;
+  let sum = 0;
+  for (let i=0;i<n;i++) {
+    const v = dataArray[i];
+    sum += v*v;
+    const y = (1 + v) * halfH;
+    if (i===0) ctx.moveTo(x,y);
+    else ctx.lineTo(x,y);
+    x += sliceWidth;
+  }
+  ctx.stroke();
+  if (!gateNode) {
+    const rms = Math.sqrt(sum / n);
+    updateLevel(rms);
+    gateFromRms(rms);
+  }
+}
+
+function showLatency() {
+  const track = stream.getAudioTracks()[0];
+  const settings = (track && track.getSettings) ? track.getSettings() : {};
+  const sec = (settings.latency || 0) + (audioCtx.baseLatency || 0) + (audioCtx.outputLatency || 0);
+  latencyLabel.textContent = `Audio latency: ${(sec * 1000).toFixed(1)} ms`;
+}
+
+async function initGateWorklet() {
+  if (!audioCtx.audioWorklet || !window.AudioWorkletNode) return;
+  try {
+    await audioCtx.audioWorklet.addModule(gateWorkletUrl);
+  } catch (e) {
+    console.warn('gate worklet unavailable, using main-thread gate', e);
+    return;
+  }
+  // No outputs: the node is a pure sink, so it keeps processing without reaching the speakers.
+  gateNode = new AudioWorkletNode(audioCtx, 'gate', { numberOfInputs: 1, numberOfOutputs: 0 });
+  gateNode.port.onmessage = ({ data }) => {
+    if (data.type === 'level') updateLevel(data.rms);
+    else if (data.type === 'gate') setGateOpen(data.open);
+    else if (data.type === 'pcm' && mediaRecorder && mediaRecorder.pushSamples) mediaRecorder.pushSamples(data.samples);
+  };
+  gateNode.port.postMessage(gateSettings());
+  source.connect(gateNode);
+}
+
+async function initMic(deviceId) {
+  if (stream) {
+    for (const t of stream.getTracks()) t.stop();
+  }
+
+  // Raw, low-latency capture: the browser's AGC and suppression would fight the noise gate.
+  const constraints = {
+    audio: {
+      deviceId: deviceId ? { exact: deviceId } : undefined,
+      echoCancellation: false,
+      noiseSuppression: false,
+      autoGainControl: false,
+      channelCount: 1,
+      latency: 0,
+    }
+  };
+
+  stream = await navigator.mediaDevices.getUserMedia(constraints);
+  audioCtx = new (window.AudioContext || window.webkitAudioContext)({ latencyHint: 'interactive' });
+  showLatency();
+  analyser = audioCtx.createAnalyser();
+  // 512 samples (~11 ms) covers the 760 px scope; smoothing only affects frequency data.
+  analyser.fftSize = 512;
+  analyser.smoothingTimeConstant = 0;
+  if (!dataArray || dataArray.length !== analyser.fftSize) {
+    dataArray = new Float32Array(analyser.fftSize);
+  }
+  source = audioCtx.createMediaStreamSource(stream);
+  source.connect(analyser);
+  await initGateWorklet();
+  rafId = requestAnimationFrame(draw);
+
+  const options = { mimeType: 'audio/webm;codecs=opus' };
+  if (gateNode && await OpusPacketRecorder.isSupported(audioCtx.sampleRate)) {
+    mediaRecorder = new OpusPacketRecorder(audioCtx.sampleRate);
+    gateNode.port.postMessage({ capture: true });
+  } else {
+    mediaRecorder = MediaRecorder.isTypeSupported(options.mimeType)
+      ? new MediaRecorder(stream, options)
+      : new MediaRecorder(stream);
+  }
+
+  mediaRecorder.ondataavailable = (e) => {
+    if (session && e.data && e.data.size > 0) queueChunk(session, e.data);
+  };
+
+  mediaRecorder.onstop = () => {
+    lastSession = session;
+    session = null;
+    saveBtn.disabled = false;
+    setStatus('Ready to save');
+  };
+
+  await refreshDevices();
+}
+
+function recorderExt() {
+  const type = mediaRecorder.mimeType || '';
+  if (type === 'application/x-opus-packets') return 'opuspkt';
+  return type.includes('webm') ? 'webm' : 'bin';
+}
+
+function newSession() {
+  return {
+    sid: crypto.randomUUID(),
+    seq: 0,
+    ext: recorderExt(),
+    chain: Promise.resolve(),
+    failed: new Map(),
+  };
+}
+
+async function postChunk(sid, seq, blob) {
+  const res = await fetch(`/api/upload_chunk?sid=${sid}&seq=${seq}`, {
+    method: 'POST',
+    body: blob,
+    headers: { 'Content-Type': blob.type || 'application/octet-stream' },
+  });
+  if (!res.ok) throw new Error(`chunk ${seq} upload failed: ${res.status}`);
+}
+
+function queueChunk(s, blob) {
+  const seq = s.seq++;
+  // Chunks go up one at a time, in order, while recording continues; only
+  // chunks that failed are kept in memory, to be retried on save.
+  s.chain = s.chain
+    .then(() => postChunk(s.sid, seq, blob))
+    .catch((err) => {
+      console.warn(err);
+      s.failed.set(seq, blob);
+    });
+}
+
+async function flushSession(s) {
+  await s.chain;
+  const retry = [...s.failed.entries()].sort((a, b) => a[0] - b[0]);
+  for (const [seq, blob] of retry) {
+    await postChunk(s.sid, seq, blob);
+    s.failed.delete(seq);
+  }
+}
+
+async function uploadSession(s) {
+  setStatus('Uploading…');
+  await flushSession(s);
+  const fd = new FormData();
+  const base = (nameBase.value || 'recording').trim();
+  fd.append('sid', s.sid);
+  fd.append('ext', s.ext);
+  fd.append('name_base', base);
+  const ts = (trimStart.value || '').trim();
+  const te = (trimEnd.value || '').trim();
+  if (ts) fd.append('trim_start', ts);
+  if (te) fd.append('trim_end', te);
+  fd.append('output_format', outputFormat.value || 'ogg');
+  if (autoUploadGcs.checked) {
+    autoGcsIndicator.style.display = 'inline';
+    autoGcsIndicator.textContent = '⏳';
+    mainAutoGcsIndicator.style.display = 'inline';
+    mainAutoGcsIndicator.classList.add('pulse');
+  }
+  if (autoTranscribe.checked) {
+    autoTranscribeIndicator.style.display = 'inline';
+    autoTranscribeIndicator.textContent = '⏳';
+    mainAutoTranscribeIndicator.style.display = 'inline';
+    mainAutoTranscribeIndicator.classList.add('pulse');
+  }
+  if (autoUploadGcs.checked) fd.append('auto_upload_gcs', '1');
+  if (autoTranscribe.checked) fd.append('auto_transcribe', '1');
+
+  const res = await fetch('/api/finalize', { method: 'POST', body: fd });
+  if (!res.ok) {
+    const txt = await res.text();
+    setStatus('Error');
+    alert(txt);
+    return;
+  }
+  const data = await res.json();
+  lastSession = null;
+  setStatus('Saved');
+  lastSaved.textContent = data.output_filename || data.original_filename;
+  if (typeof lastRecordedMs === 'number') {
+    lastDuration.textContent = `${fmtTime(lastRecordedMs)} (${(lastRecordedMs/1000).toFixed(2)}s)`;
+  }
+  // Auto status feedback
+  const autoParts = [];
+  if (data.auto_gcs_uploaded) autoParts.push('GCS');
+  if (data.auto_transcribed) autoParts.push('Transcribed');
+  autoStatus.textContent = autoParts.length ? autoParts.join(' + ') : 'Disabled';
+
+  // Update indicators
+  if (autoUploadGcs.checked) {
+    autoGcsIndicator.textContent = data.auto_gcs_uploaded ? '✅' : '❌';
+    mainAutoGcsIndicator.classList.remove('pulse');
+    mainAutoGcsIndicator.style.display = 'none';
+  }
+  if (autoTranscribe.checked) {
+    autoTranscribeIndicator.textContent = data.auto_transcribed ? '✅' : '❌';
+    mainAutoTranscribeIndicator.classList.remove('pulse');
+    mainAutoTranscribeIndicator.style.display = 'none';
+  }
+  links.innerHTML = '';
+  if (data.output_url) {
+    const a = document.createElement('a');
+    a.href = '#';
+    a.textContent = `Download ${(data.format || 'mp3').toUpperCase()}`;
+    a.addEventListener('click', async (e) => {
+      e.preventDefault();
+      await saveWithPicker(data.output_url, data.output_filename, data.format);
+    });
+    links.appendChild(a);
+    lastOutputUrl = data.output_url;
+    playBtn.disabled = false;
+    // Fetch only the header up front; seeking then issues small Range requests.
+    player.preload = 'metadata';
+    player.src = data.output_url;
+    player.style.display = 'block';
+  }
+}
+
+function startTimer() {
+  startTs = Date.now();
+  timerPill.textContent = '00:00';
+  timerId = setInterval(() => {
+    const elapsed = Date.now() - startTs;
+    timerPill.textContent = fmtTime(elapsed);
+  }, 200);
+}
+
+function stopTimer() {
+  clearInterval(timerId);
+  timerId = null;
+  timerPill.textContent = '00:00';
+}
+
+startBtn.addEventListener('click', async () => {
+  try {
+    if (!mediaRecorder) await initMic(deviceSelect.value);
+    setStatus('Recording…');
+    startBtn.disabled = true;
+    stopBtn.disabled = false;
+    playBtn.disabled = true;
+    saveBtn.disabled = true;
+    recordingActive = true;
+    gatePaused = false;
+    silenceStartedAt = null;
+    if (gateNode) gateNode.port.postMessage({ reset: true });
+    session = newSession();
+    mediaRecorder.start(CHUNK_MS);
+    startTimer();
+  } catch (err) {
+    console.error(err);
+    alert('Microphone init failed: ' + err);
+  }
+});
+
+stopBtn.addEventListener('click', () => {
+  try {
+    setStatus('Stopping…');
+    stopBtn.disabled = true;
+    startBtn.disabled = false;
+    stopTimer();
+    lastRecordedMs = Date.now() - startTs;
+    recordingActive = false;
+    mediaRecorder.stop();
+  } catch (err) {
+    console.error(err);
+    alert('Stop failed: ' + err);
+  }
+});
+
+saveBtn.addEventListener('click', async () => {
+  try {
+    if (!lastSession) {
+      alert('Nothing to save yet. Record and stop first.');
+      return;
+    }
+    saveBtn.disabled = true;
+    await uploadSession(lastSession);
+  } catch (err) {
+    console.error(err);
+    setStatus('Error');
+    alert('Save failed: ' + err);
+    saveBtn.disabled = false;
+  }
+});
+
+playBtn.addEventListener('click', () => {
+  if (!lastOutputUrl) return;
+  player.play();
+});
+
+setStatus('Idle');
+lastDuration.textContent = 'None';
+downloadStatus.textContent = 'Not downloaded';
+
+aboutBtn.addEventListener('click', openAbout);
+aboutCloseBtn.addEventListener('click', closeAbout);
+aboutBackdrop.addEventListener('click', (e) => {
+  if (e.target === aboutBackdrop) closeAbout();
+});
+settingsBtn.addEventListener('click', openSettings);
+settingsCloseBtn.addEventListener('click', closeSettings);
+settingsBackdrop.addEventListener('click', (e) => {
+  if (e.target === settingsBackdrop) closeSettings();
+});
+for (const el of [gateThreshold, gateHold]) {
+  el.addEventListener('input', () => {
+    if (gateNode) gateNode.port.postMessage(gateSettings());
+  });
+}
+autoUploadGcs.addEventListener('change', () => {
+  if (!autoUploadGcs.checked) autoGcsIndicator.style.display = 'none';
+});
+autoTranscribe.addEventListener('change', () => {
+  if (!autoTranscribe.checked) autoTranscribeIndicator.style.display = 'none';
+});
+window.addEventListener('keydown', (e) => {
+  if (e.key === 'Escape') {
+    closeAbout();
+    closeSettings();
+  }
+});
+
+// Keyboard shortcuts
+window.addEventListener('keydown', async (e) => {
+  if (e.ctrlKey && (e.key === 's' || e.key === 'S')) {
+    e.preventDefault();
+    if (!saveBtn.disabled) saveBtn.click();
+    return;
+  }
+
+  if (e.code === 'Space') {
+    const tag = (e.target && e.target.tagName) ? e.target.tagName.toLowerCase() : '';
+    if (tag === 'input' || tag === 'textarea' || tag === 'select') return;
+    e.preventDefault();
+    if (!startBtn.disabled) startBtn.click();
+    else if (!stopBtn.disabled) stopBtn.click();
+  }
+});
+
+// Player scrub timeline
+player.addEventListener('loadedmetadata', () => {
+  scrub.max = player.duration || 0;
+  scrub.value = 0;
+  scrubWrap.style.display = 'block';
+  scrubLabel.textContent = `00:00 / ${fmtTime(Math.floor((player.duration || 0) * 1000))}`;
+});
+player.addEventListener('timeupdate', () => {
+  if (!isFinite(player.duration) || player.duration <= 0) return;
+  scrub.max = player.duration;
+  scrub.value = player.currentTime;
+  scrubLabel.textContent = `${fmtTime(Math.floor(player.currentTime * 1000))} / ${fmtTime(Math.floor(player.duration * 1000))}`;
+});
+scrub.addEventListener('input', () => {
+  player.currentTime = parseFloat(scrub.value || '0');
+});
@@ -0,0 +1,104 @@
+// Noise-gate detector that runs on the audio rendering thread.
+//
+// Per sample, the rectified input drives a log-domain envelope follower
+// (fast attack, slow release). The gate opens when the envelope rises above
+// the open threshold and closes only after it has stayed below a threshold
+// 6 dB lower (hysteresis) for the hold time. The effective threshold also
+// tracks a decaying peak level, A_min = 10^((log10 A_imp - 3) / 2), so loud
+// sources and distant mics both gate sensibly. Only open/close transitions
+// and a ~20 ms meter level are posted to the page, plus the raw samples in
+// the same windows when the page asks for them ({capture: true}) to feed
+// its WebCodecs encoder.
+
+const FLOOR_DB = -120;
+const HYSTERESIS_DB = 6;
+
+function timeCoef(ms) {
+  return 1 - Math.exp(-1 / ((ms / 1000) * sampleRate));
+}
+
+class GateProcessor extends AudioWorkletProcessor {
+  constructor() {
+    super();
+    this.thresholdDb = 20 * Math.log10(0.07);
+    this.holdSamples = 0.8 * sampleRate;
+    this.attack = timeCoef(1);
+    this.release = timeCoef(80);
+    // Peak tracker falls to 1/100 of its value in 0.5 s.
+    this.peakDecay = Math.pow(0.01, 1 / (0.5 * sampleRate));
+    this.peak = 0;
+    this.envDb = FLOOR_DB;
+    this.open = true;
+    this.holdLeft = this.holdSamples;
+    this.windowSamples = 1024;
+    this.sum = 0;
+    this.count = 0;
+    this.capture = false;
+    this.pcm = new Float32Array(this.windowSamples);
+    this.port.onmessage = ({ data }) => {
+      if (typeof data.threshold === 'number') this.thresholdDb = 20 * Math.log10(Math.max(data.threshold, 1e-6));
+      if (typeof data.holdMs === 'number') this.holdSamples = (data.holdMs / 1000) * sampleRate;
+      if (typeof data.capture === 'boolean') this.capture = data.capture;
+      if (data.reset) {
+        this.open = true;
+        this.holdLeft = this.holdSamples;
+      }
+    };
+  }
+
+  process(inputs) {
+    const ch = inputs[0] && inputs[0][0];
+    if (!ch) return true;
+
+    let s = 0;
+    let peak = this.peak;
+    let envDb = this.envDb;
+    for (let i = 0; i < ch.length; i++) {
+      const x = ch[i];
+      s += x * x;
+      const a = Math.abs(x);
+      peak = Math.max(peak * this.peakDecay, a);
+      const xDb = a > 1e-6 ? 20 * Math.log10(a) : FLOOR_DB;
+      envDb += (xDb > envDb ? this.attack : this.release) * (xDb - envDb);
+    }
+    this.peak = peak;
+    this.envDb = envDb;
+
+    // Adaptive floor from the decaying peak; the slider sets the minimum.
+    const adaptiveDb = peak > 0 ? 20 * ((Math.log10(peak) - 3) / 2) : FLOOR_DB;
+    const openDb = Math.max(this.thresholdDb, adaptiveDb);
+    const closeDb = openDb - HYSTERESIS_DB;
+
+    if (envDb >= openDb) {
+      this.holdLeft = this.holdSamples;
+      if (!this.open) {
+        this.open = true;
+        this.port.postMessage({ type: 'gate', open: true });
+      }
+    } else if (envDb >= closeDb) {
+      this.holdLeft = this.holdSamples;
+    } else if (this.open) {
+      this.holdLeft -= ch.length;
+      if (this.holdLeft <= 0) {
+        this.open = false;
+        this.port.postMessage({ type: 'gate', open: false });
+      }
+    }
+
+    if (this.capture) this.pcm.set(ch, this.count);
+    this.sum += s;
+    this.count += ch.length;
+    if (this.count >= this.windowSamples) {
+      this.port.postMessage({ type: 'level', rms: Math.sqrt(this.sum / this.count) });
+      if (this.capture) {
+        this.port.postMessage({ type: 'pcm', samples: this.pcm }, [this.pcm.buffer]);
+        this.pcm = new Float32Array(this.windowSamples);
+      }
+      this.sum = 0;
+      this.count = 0;
+    }
+    return true;
+  }
+}
+
+registerProcessor('gate', GateProcessor);
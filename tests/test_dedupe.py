@@ -0,0 +1,137 @@
+"""Checks for reusing an earlier save when the same take is saved again.
+
+Run with: python -m unittest discover tests
+Needs a working ffmpeg (the bundled ./ffmpeg or one on PATH).
+"""
+
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+warnings.filterwarnings("ignore", category=DeprecationWarning)
+import audio_recorder
+from fastapi.testclient import TestClient
+
+
+def _working_ffmpeg() -> str | None:
+    for candidate in (audio_recorder._ffmpeg_bin(), shutil.which("ffmpeg")):
+        if not candidate:
+            continue
+        try:
+            subprocess.run([candidate, "-version"], capture_output=True, check=True)
+        except (OSError, subprocess.CalledProcessError):
+            continue
+        return candidate
+    return None
+
+
+FFMPEG = _working_ffmpeg()
+
+
+class _ScratchDirsMixin:
+    """Point the app's recordings, index and session paths at a temporary directory."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        tmp = Path(self._tmp.name)
+        self._saved_paths = (audio_recorder.RECORDINGS_DIR, audio_recorder.DEDUPE_INDEX, audio_recorder.PARTIAL_DIR)
+        audio_recorder.RECORDINGS_DIR = tmp / "recordings"
+        audio_recorder.DEDUPE_INDEX = tmp / "recordings_index.json"
+        audio_recorder.PARTIAL_DIR = tmp / "partial_uploads"
+        audio_recorder.RECORDINGS_DIR.mkdir()
+        audio_recorder.PARTIAL_DIR.mkdir()
+
+    def tearDown(self):
+        audio_recorder.RECORDINGS_DIR, audio_recorder.DEDUPE_INDEX, audio_recorder.PARTIAL_DIR = self._saved_paths
+        self._tmp.cleanup()
+
+
+class DedupeIndexTest(_ScratchDirsMixin, unittest.TestCase):
+    def test_concurrent_stores_keep_every_entry(self):
+        (audio_recorder.RECORDINGS_DIR / "take.ogg").write_bytes(b"audio")
+        result = {"output_filename": "take.ogg"}
+        keys = [f"key{i}" for i in range(32)]
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda key: audio_recorder._dedupe_store(key, result), keys))
+        for key in keys:
+            self.assertEqual(audio_recorder._dedupe_lookup(key), result)
+
+    def test_changed_output_is_a_miss(self):
+        output = audio_recorder.RECORDINGS_DIR / "take.ogg"
+        output.write_bytes(b"audio")
+        audio_recorder._dedupe_store("key", {"output_filename": "take.ogg"})
+        output.write_bytes(b"another take")
+        self.assertIsNone(audio_recorder._dedupe_lookup("key"))
+
+
+@unittest.skipIf(FFMPEG is None, "no runnable ffmpeg")
+class UploadDedupeTest(_ScratchDirsMixin, unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = Path(tmp) / "tone.m4a"
+            subprocess.run(
+                [FFMPEG, "-v", "error", "-f", "lavfi", "-i", "sine=frequency=440:duration=3",
+                 "-ac", "1", "-c:a", "aac", str(source)],
+                check=True,
+            )
+            cls.take = source.read_bytes()
+
+    def setUp(self):
+        super().setUp()
+        self._ffmpeg_bin = audio_recorder._ffmpeg_bin
+        self._tee_to_ffmpeg = audio_recorder._tee_to_ffmpeg
+        audio_recorder._ffmpeg_bin = lambda: FFMPEG
+        self.client = TestClient(audio_recorder.app)
+
+    def tearDown(self):
+        audio_recorder._ffmpeg_bin = self._ffmpeg_bin
+        audio_recorder._tee_to_ffmpeg = self._tee_to_ffmpeg
+        super().tearDown()
+
+    def _upload(self, **form) -> dict:
+        response = self.client.post("/api/upload", files={"file": ("take.m4a", self.take)}, data=form)
+        self.assertEqual(response.status_code, 200, response.text)
+        return response.json()
+
+    def _forbid_ffmpeg(self):
+        async def tee(*args, **kwargs):
+            raise AssertionError("ffmpeg ran on a dedupe hit")
+
+        audio_recorder._tee_to_ffmpeg = tee
+
+    def test_repeat_upload_reuses_output_without_ffmpeg(self):
+        first = self._upload(name_base="take")
+        self._forbid_ffmpeg()
+        again = self._upload(name_base="take")
+        self.assertEqual(again["output_filename"], first["output_filename"])
+
+    def test_changed_trim_or_format_is_a_miss(self):
+        first = self._upload(name_base="take")
+        for form in ({"trim_start": "1"}, {"output_format": "mp3"}):
+            with self.subTest(**form):
+                result = self._upload(name_base="take", **form)
+                self.assertNotEqual(result["output_filename"], first["output_filename"])
+
+    def test_deleted_output_is_a_miss(self):
+        first = self._upload(name_base="take")
+        (audio_recorder.RECORDINGS_DIR / first["output_filename"]).unlink()
+        again = self._upload(name_base="take")
+        self.assertTrue((audio_recorder.RECORDINGS_DIR / again["output_filename"]).is_file())
+
+    def test_same_second_saves_do_not_share_files(self):
+        first = self._upload(name_base="take")
+        trimmed = self._upload(name_base="take", trim_start="1")
+        self.assertNotEqual(trimmed["original_filename"], first["original_filename"])
+        self.assertNotEqual(trimmed["output_filename"], first["output_filename"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+"""Regression checks for trimmed and failed streamed saves.
+
+Run with: python -m unittest discover tests
+Needs a working ffmpeg with libopus (the bundled ./ffmpeg or one on PATH).
+"""
+
+import re
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import unittest
+import uuid
+import warnings
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+warnings.filterwarnings("ignore", category=DeprecationWarning)
+import audio_recorder
+from fastapi.testclient import TestClient
+
+
+def _working_ffmpeg() -> str | None:
+    for candidate in (audio_recorder._ffmpeg_bin(), shutil.which("ffmpeg")):
+        if not candidate:
+            continue
+        try:
+            subprocess.run([candidate, "-version"], capture_output=True, check=True)
+        except (OSError, subprocess.CalledProcessError):
+            continue
+        return candidate
+    return None
+
+
+FFMPEG = _working_ffmpeg()
+
+
+def _ogg_packets(data: bytes) -> list[bytes]:
+    packets, current, pos = [], b"", 0
+    while pos < len(data):
+        segments = data[pos + 27 : pos + 27 + data[pos + 26]]
+        body = pos + 27 + len(segments)
+        for size in segments:
+            current += data[body : body + size]
+            body += size
+            if size < 255:
+                packets.append(current)
+                current = b""
+        pos = body
+    return packets[2:]  # drop OpusHead / OpusTags
+
+
+def _decoded_seconds(path: Path) -> float:
+    """Decode the whole file; fail if ffmpeg reports any error."""
+    result = subprocess.run(
+        [FFMPEG, "-v", "error", "-stats", "-i", str(path), "-f", "null", "-"],
+        capture_output=True,
+        text=True,
+    )
+    errors = [line for line in result.stderr.splitlines() if "time=" not in line and line.strip()]
+    if result.returncode != 0 or errors:
+        raise AssertionError(f"ffmpeg could not decode {path.name}: {result.stderr}")
+    hours, minutes, seconds = re.findall(r"time=(\d+):(\d+):([\d.]+)", result.stderr)[-1]
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+@unittest.skipIf(FFMPEG is None, "no runnable ffmpeg")
+class TrimmedOggRemuxTest(unittest.TestCase):
+    """A trimmed WebCodecs (opuspkt) session is stream-copied from an Ogg pipe."""
+
+    def setUp(self):
+        # Save into scratch folders, not the app's recordings, index and sessions.
+        self._tmp = tempfile.TemporaryDirectory()
+        tmp = Path(self._tmp.name)
+        self._saved_paths = (audio_recorder.RECORDINGS_DIR, audio_recorder.DEDUPE_INDEX, audio_recorder.PARTIAL_DIR)
+        audio_recorder.RECORDINGS_DIR = tmp / "recordings"
+        audio_recorder.DEDUPE_INDEX = tmp / "recordings_index.json"
+        audio_recorder.PARTIAL_DIR = tmp / "partial_uploads"
+        audio_recorder.RECORDINGS_DIR.mkdir()
+        audio_recorder.PARTIAL_DIR.mkdir()
+        self._ffmpeg_bin = audio_recorder._ffmpeg_bin
+        audio_recorder._ffmpeg_bin = lambda: FFMPEG
+        self.client = TestClient(audio_recorder.app)
+
+    def tearDown(self):
+        audio_recorder._ffmpeg_bin = self._ffmpeg_bin
+        audio_recorder.RECORDINGS_DIR, audio_recorder.DEDUPE_INDEX, audio_recorder.PARTIAL_DIR = self._saved_paths
+        self._tmp.cleanup()
+
+    def _opus_session(self, seconds: int) -> bytes:
+        with tempfile.TemporaryDirectory() as tmp:
+            source = Path(tmp) / "tone.ogg"
+            subprocess.run(
+                [FFMPEG, "-v", "error", "-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}",
+                 "-ac", "1", "-ar", "48000", "-c:a", "libopus", "-frame_duration", "20", str(source)],
+                check=True,
+            )
+            packets = _ogg_packets(source.read_bytes())
+        return b"".join(struct.pack("<II", len(p), 960) + p for p in packets)
+
+    def _finalize(self, stream: bytes, status: int = 200, **form) -> dict:
+        sid = str(uuid.uuid4())
+        for seq, offset in enumerate(range(0, len(stream), 4096)):
+            response = self.client.post(
+                f"/api/upload_chunk?sid={sid}&seq={seq}", content=stream[offset : offset + 4096]
+            )
+            self.assertEqual(response.status_code, 200, response.text)
+        response = self.client.post("/api/finalize", data={"sid": sid, "ext": "opuspkt", **form})
+        self.assertEqual(response.status_code, status, response.text)
+        return response.json()
+
+    def test_trim_window_is_decodable_and_exact(self):
+        stream = self._opus_session(10)
+        for start, end in ((4, 6), (2, 3)):
+            with self.subTest(start=start, end=end):
+                result = self._finalize(stream, name_base=f"trim{start}", trim_start=start, trim_end=end)
+                self.assertEqual(result["format"], "ogg")
+                seconds = _decoded_seconds(audio_recorder.RECORDINGS_DIR / result["output_filename"])
+                self.assertAlmostEqual(seconds, end - start, delta=0.1)
+
+    def test_failed_save_leaves_no_files(self):
+        stream = self._opus_session(10)
+        # Cut mid-packet, after enough audio that the source file is already being written.
+        self._finalize(stream[: len(stream) // 2 + 3], status=400, name_base="trunc")
+        self.assertEqual(list(audio_recorder.RECORDINGS_DIR.iterdir()), [])
+
+
+if __name__ == "__main__":
+    unittest.main()